@@ -0,0 +1,81 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+__copyright__ = '''\
+Copyright (C) m-click.aero GmbH
+
+Permission to use, copy, modify, and/or distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+'''
+
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from jsontyping import GzipOptions, _gzipfile, serialize_json
+from timeit import default_timer
+from typing import Dict, List, NamedTuple
+
+Record = NamedTuple('Record', [
+    ('id', int),
+    ('name', str),
+    ('status', str),
+    ('value', float),
+    ('created', datetime),
+    ('valid_until', date),
+    ('tags', Dict[str, str]),
+])
+
+Export = NamedTuple('Export', [
+    ('generated', datetime),
+    ('records', List[Record]),
+])
+
+def representative_payload(record_count):
+    start = datetime(2016, 7, 1, 18, 0, 28, 123456)
+    return Export(
+        generated=start,
+        records=[
+            Record(
+                id=i,
+                name='record {}'.format(i),
+                status=('active', 'inactive', 'pending')[i % 3],
+                value=i * 1.25,
+                created=start + timedelta(seconds=i * 17, microseconds=i),
+                valid_until=(start + timedelta(days=i % 365)).date(),
+                tags={'source': 'import', 'batch': str(i // 100)},
+            )
+            for i in range(record_count)
+        ],
+    )
+
+def compress(jsonbytes, gzip_options):
+    output_stream = BytesIO()
+    with _gzipfile(output_stream, gzip_options) as uncompressed_stream:
+        uncompressed_stream.write(jsonbytes)
+    return output_stream.getvalue()
+
+def main():
+    jsonbytes = serialize_json(representative_payload(20000), Export)
+    print('Uncompressed size: {} bytes'.format(len(jsonbytes)))
+    print('{:>5} {:>12} {:>8} {:>10}'.format('level', 'size', 'ratio', 'seconds'))
+    for compresslevel in range(1, 10):
+        start_time = default_timer()
+        size = len(compress(jsonbytes, GzipOptions(compresslevel=compresslevel)))
+        elapsed_time = default_timer() - start_time
+        print('{:>5} {:>12} {:>8.3f} {:>10.3f}'.format(compresslevel, size, size / len(jsonbytes), elapsed_time))
+    print('{:>7} {:>12} {:>8} {:>10}'.format('threads', 'size', 'ratio', 'seconds'))
+    for threads in [2, 4, 8]:
+        start_time = default_timer()
+        size = len(compress(jsonbytes, GzipOptions(threads=threads)))
+        elapsed_time = default_timer() - start_time
+        print('{:>7} {:>12} {:>8.3f} {:>10.3f}'.format(threads, size, size / len(jsonbytes), elapsed_time))
+
+if __name__ == '__main__':
+    main()
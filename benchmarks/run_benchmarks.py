@@ -0,0 +1,236 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+__copyright__ = '''\
+Copyright (C) m-click.aero GmbH
+
+Permission to use, copy, modify, and/or distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+'''
+
+# Standalone benchmark runner, reporting operations per second and peak memory
+#
+# Usage: python3 benchmarks/run_benchmarks.py [--save NAME] [--compare NAME] [PATTERN...]
+#
+# Baselines are stored as JSON files in benchmarks/baselines/, so results of
+# different revisions can be compared on the same machine.
+
+from argparse import ArgumentParser
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from json import dump, load
+from jsontyping import compile_decoder, read_json, read_json_gz, serialize_json, serialize_json_gz
+from os import makedirs
+from os.path import dirname, isdir, join
+from timeit import default_timer
+from tracemalloc import get_traced_memory, start as start_tracemalloc, stop as stop_tracemalloc
+from typing import Dict, List, NamedTuple, Union, get_type_hints
+
+BASELINES_DIRECTORY = join(dirname(__file__), 'baselines')
+
+START = datetime(2016, 7, 1, 18, 0, 28, 123456)
+
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+Wide = NamedTuple('Wide', [('field{:02}'.format(i), (int, float, str, bool)[i % 4]) for i in range(60)])
+
+WideExport = NamedTuple('WideExport', [
+    ('records', List[Wide]),
+])
+
+Leaf = NamedTuple('Leaf', [
+    ('a', int),
+    ('b', str),
+])
+
+def nested_type(depth):
+    result_type = Leaf
+    for level in range(depth):
+        result_type = NamedTuple('Level{}'.format(level), [
+            ('items', List[result_type]),
+            ('name', str),
+        ])
+    return result_type
+
+Deep = nested_type(12)
+
+DeepExport = NamedTuple('DeepExport', [
+    ('root', Deep),
+])
+
+Variants = [NamedTuple('Variant{:02}'.format(i), [('v{}'.format(j), int) for j in range(i % 5 + 1)]) for i in range(24)]
+
+UnionExport = NamedTuple('UnionExport', [
+    ('records', List[Union[tuple(Variants)]]),
+])
+
+Event = NamedTuple('Event', [
+    ('created', datetime),
+    ('modified', datetime),
+    ('due', date),
+    ('duration', timedelta),
+])
+
+EventExport = NamedTuple('EventExport', [
+    ('records', List[Event]),
+])
+
+DateMapExport = NamedTuple('DateMapExport', [
+    ('maps', List[Dict[str, date]]),
+])
+
+Record = NamedTuple('Record', [
+    ('id', int),
+    ('name', str),
+    ('status', str),
+    ('value', float),
+    ('created', datetime),
+    ('valid_until', date),
+    ('tags', Dict[str, str]),
+])
+
+Export = NamedTuple('Export', [
+    ('generated', datetime),
+    ('records', List[Record]),
+])
+
+def wide_payload():
+    return WideExport(records=[Wide(*[(i + j, (i + j) * 0.5, 'x{}'.format(i + j), (i + j) % 2 == 0)[j % 4] for j in range(60)]) for i in range(2000)])
+
+def deep_payload():
+    def build(result_type, level):
+        if result_type is Leaf:
+            return Leaf(a=level, b='leaf')
+        (item_type,) = get_type_hints(result_type)['items'].__args__
+        return result_type(items=[build(item_type, level + 1) for _ in range(2)], name='level{}'.format(level))
+    return DeepExport(root=build(Deep, 0))
+
+def union_payload():
+    return UnionExport(records=[Variants[i % len(Variants)](*range(i % len(Variants) % 5 + 1)) for i in range(20000)])
+
+def event_payload():
+    return EventExport(records=[
+        Event(
+            created=START + timedelta(seconds=i * 17, microseconds=i),
+            modified=START + timedelta(seconds=i * 19),
+            due=(START + timedelta(days=i % 365)).date(),
+            duration=timedelta(seconds=i, microseconds=i % 1000),
+        )
+        for i in range(20000)
+    ])
+
+def date_map_payload():
+    return DateMapExport(maps=[{'key{}'.format(j): date(2016, 1, 1) + timedelta(days=i + j) for j in range(20)} for i in range(2000)])
+
+def gz_payload():
+    return Export(
+        generated=START,
+        records=[
+            Record(
+                id=i,
+                name='record {}'.format(i),
+                status=('active', 'inactive', 'pending')[i % 3],
+                value=i * 1.25,
+                created=START + timedelta(seconds=i * 17, microseconds=i),
+                valid_until=(START + timedelta(days=i % 365)).date(),
+                tags={'source': 'import', 'batch': str(i // 100)},
+            )
+            for i in range(30000)
+        ],
+    )
+
+def json_benchmarks(name, result_type, payload):
+    value = payload()
+    jsonbytes = serialize_json(value, result_type)
+    return [
+        ('{}.encode'.format(name), lambda: serialize_json(value, result_type)),
+        ('{}.decode'.format(name), lambda: read_json(result_type, BytesIO(jsonbytes))),
+    ]
+
+def gz_benchmarks():
+    value = gz_payload()
+    compressed = serialize_json_gz(value, Export)
+    return [
+        ('gz_roundtrip.encode', lambda: serialize_json_gz(value, Export)),
+        ('gz_roundtrip.decode', lambda: read_json_gz(Export, BytesIO(compressed))),
+    ]
+
+def datetime_parsing_benchmarks():
+    jsondata = [(START + timedelta(seconds=i * 17, microseconds=i)).strftime(DATETIME_FORMAT) for i in range(10000)]
+    decode = compile_decoder(List[datetime])
+    return [
+        ('datetime_parsing.decoder', lambda: decode(jsondata)),
+        ('datetime_parsing.strptime', lambda: [datetime.strptime(item, DATETIME_FORMAT) for item in jsondata]),
+    ]
+
+def all_benchmarks():
+    return (
+        json_benchmarks('wide_namedtuple', WideExport, wide_payload)
+        + json_benchmarks('deep_nesting', DeepExport, deep_payload)
+        + json_benchmarks('union_variants', UnionExport, union_payload)
+        + json_benchmarks('timestamps', EventExport, event_payload)
+        + json_benchmarks('date_maps', DateMapExport, date_map_payload)
+        + gz_benchmarks()
+        + datetime_parsing_benchmarks()
+    )
+
+def measure(function, min_seconds=1.0, repeat=3):
+    function() # Warm up compiled caches
+    best_seconds = None
+    for _ in range(repeat):
+        count = 0
+        start_time = default_timer()
+        while True:
+            function()
+            count += 1
+            elapsed_time = default_timer() - start_time
+            if elapsed_time >= min_seconds / repeat:
+                break
+        seconds = elapsed_time / count
+        best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+    start_tracemalloc()
+    try:
+        function()
+        (_, peak_bytes) = get_traced_memory()
+    finally:
+        stop_tracemalloc()
+    return {'ops_per_second': 1 / best_seconds, 'peak_memory_bytes': peak_bytes}
+
+def main():
+    parser = ArgumentParser(description='Run jsontyping benchmarks')
+    parser.add_argument('--save', metavar='NAME', help='store results as baseline NAME')
+    parser.add_argument('--compare', metavar='NAME', help='compare results with baseline NAME')
+    parser.add_argument('patterns', nargs='*', help='only run benchmarks whose name contains one of these')
+    args = parser.parse_args()
+    baseline = {}
+    if args.compare:
+        with open(join(BASELINES_DIRECTORY, args.compare + '.json')) as baseline_file:
+            baseline = load(baseline_file)
+    results = {}
+    print('{:<28} {:>12} {:>14} {:>9}'.format('benchmark', 'ops/sec', 'peak memory', 'speedup'))
+    for name, function in all_benchmarks():
+        if args.patterns and not any(pattern in name for pattern in args.patterns):
+            continue
+        result = measure(function)
+        results[name] = result
+        speedup = ''
+        if name in baseline:
+            speedup = '{:.2f}x'.format(result['ops_per_second'] / baseline[name]['ops_per_second'])
+        print('{:<28} {:>12.2f} {:>11.1f} MB {:>9}'.format(name, result['ops_per_second'], result['peak_memory_bytes'] / 1e6, speedup))
+    if args.save:
+        if not isdir(BASELINES_DIRECTORY):
+            makedirs(BASELINES_DIRECTORY)
+        with open(join(BASELINES_DIRECTORY, args.save + '.json'), 'w') as baseline_file:
+            dump(results, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write('\n')
+
+if __name__ == '__main__':
+    main()
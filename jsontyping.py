@@ -16,94 +16,1360 @@ ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
 OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 '''
 
-from collections import OrderedDict
+from array import array
+from collections import OrderedDict, deque
+from copy import deepcopy
 from datetime import date, datetime, timedelta
-from gzip import GzipFile
-from inspect import isclass
+from functools import partial
+from hashlib import sha256
 from io import BytesIO
-from typing import Dict, List, Union
-from codecs import getreader, getwriter
-from json import dump as json_dump, load as json_load
+from itertools import chain, islice
+from typing import Dict, List, NamedTuple, NewType, Union, get_type_hints
+from json import JSONDecoder, dumps as json_dumps, loads as json_loads
+from json.encoder import encode_basestring as _json_string
+from mmap import ACCESS_READ, mmap
 from numbers import Integral
+from operator import itemgetter
+from os import fstat
+from re import compile as re_compile
+from struct import pack
+from timeit import default_timer
+from zlib import DEFLATED, DEF_MEM_LEVEL, MAX_WBITS, Z_DEFAULT_STRATEGY, compressobj, crc32, decompressobj, error as zlib_error
+
+try:
+    from typing import get_args as _get_args, get_origin as _get_origin
+except ImportError: # Python < 3.8
+    def _get_origin(some_type):
+        return getattr(some_type, '__origin__', None)
+    def _get_args(some_type):
+        return getattr(some_type, '__args__', None)
+
+try:
+    from types import UnionType as _UnionType
+except ImportError: # Python < 3.10
+    _UnionType = None
 
 if str is bytes:
     str = unicode # Compatibility with Python 2
 
+# Marks str fields whose values are deduplicated via the shared InternTable when decoding
+InternedStr = NewType('InternedStr', str)
+
 _DATE_FORMAT = '%Y-%m-%d'
 _DATETIME_UTC_FORMAT_MICROSECONDS = '%Y-%m-%dT%H:%M:%S.%fZ'
 _DATETIME_UTC_FORMAT_SECONDS = '%Y-%m-%dT%H:%M:%SZ'
 
-def _gzipfile(output_stream):
-    compresslevel = 9
-    return GzipFile(filename='', fileobj=output_stream, mode='wb', compresslevel=compresslevel, mtime=0)
+# Exactly the formats generated by jsontyping, which are parsed without strptime
+_DATE_PATTERN = re_compile('[0-9]{4}-[0-9]{2}-[0-9]{2}\\Z')
+_DATETIME_UTC_PATTERN = re_compile('[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}(?:\\.[0-9]{6})?Z\\Z')
+
+_READ_CHUNK_SIZE = 65536
+
+_WRITE_CHUNK_SIZE = 1048576
+
+_GZIP_READ_CHUNK_SIZE = 1048576
+
+_PARALLEL_CHUNKSIZE = 1000
+
+_JSON_WHITESPACE = re_compile('[ \\t\\n\\r]*')
+
+_JSON_NUMBER_START = '-0123456789'
+
+# Characters that may follow a prefix of a JSON number, which raw_decode() accepts as complete number
+_JSON_NUMBER_CONTINUATION = '.eE+-'
+
+try:
+    array('q')
+    _INT64_TYPECODE = 'q'
+except ValueError: # Python 2
+    _INT64_TYPECODE = 'l'
+
+_LONG_DIGITS_PATTERN = re_compile(b'[0-9]{19}')
+
+_WRITE_FLUSH_PIECES = 8192
+
+_INFINITY = float('inf')
+
+class GzipOptions(object):
+    '''Options for writing gzip compressed output.
+
+    compresslevel ranges from 1 (fastest) to 9 (smallest output), strategy is an optional zlib
+    strategy such as zlib.Z_FILTERED, and buffer_size is the number of bytes collected before
+    they are passed to zlib. The defaults reproduce the output of earlier versions.
+
+    With threads > 1, the data is split into blocks of block_size bytes, which are compressed
+    concurrently and written as separate gzip members (like pigz --independent). The output
+    is the same for any number of threads, but differs from the single member written otherwise.
+    '''
+
+    def __init__(self, compresslevel=9, strategy=None, buffer_size=65536, threads=1, block_size=1048576):
+        if threads < 1:
+            raise ValueError('Invalid number of threads: {!r}'.format(threads))
+        if block_size < 1:
+            raise ValueError('Invalid block size: {!r}'.format(block_size))
+        self.compresslevel = compresslevel
+        self.strategy = strategy
+        self.buffer_size = buffer_size
+        self.threads = threads
+        self.block_size = block_size
+
+    def __repr__(self):
+        return 'GzipOptions(compresslevel={!r}, strategy={!r}, buffer_size={!r}, threads={!r}, block_size={!r})'.format(self.compresslevel, self.strategy, self.buffer_size, self.threads, self.block_size)
+
+_DEFAULT_GZIP_OPTIONS = GzipOptions()
+
+def _gzip_header(compresslevel):
+    extra_flags = 2 if compresslevel == 9 else 4 if compresslevel == 1 else 0
+    return b'\x1f\x8b\x08\x00' + pack('<I', 0) + pack('<B', extra_flags) + b'\xff' # mtime=0, unknown OS
+
+class _GzipWriter(object):
+    '''Write a single gzip member with mtime=0 and no filename, like GzipFile(filename='', mtime=0).'''
+
+    def __init__(self, output_stream, gzip_options):
+        strategy = Z_DEFAULT_STRATEGY if gzip_options.strategy is None else gzip_options.strategy
+        self._output_stream = output_stream
+        self._compressor = compressobj(gzip_options.compresslevel, DEFLATED, -MAX_WBITS, DEF_MEM_LEVEL, strategy)
+        self._buffer_size = gzip_options.buffer_size
+        self._buffer = []
+        self._buffered_size = 0
+        self._crc = crc32(b'')
+        self._size = 0
+        self._output_stream.write(_gzip_header(gzip_options.compresslevel))
+
+    def write(self, data):
+        self._buffer.append(data)
+        self._buffered_size += len(data)
+        if self._buffered_size >= self._buffer_size:
+            self._compress_buffer()
+        return len(data)
+
+    def _compress_buffer(self):
+        data = b''.join(self._buffer)
+        self._buffer = []
+        self._buffered_size = 0
+        self._crc = crc32(data, self._crc)
+        self._size += len(data)
+        self._output_stream.write(self._compressor.compress(data))
+
+    def close(self):
+        if self._compressor is None:
+            return
+        self._compress_buffer()
+        self._output_stream.write(self._compressor.flush())
+        self._output_stream.write(pack('<II', self._crc & 0xffffffff, self._size & 0xffffffff))
+        self._compressor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def _gzip_member(data, compresslevel, strategy):
+    compressor = compressobj(compresslevel, DEFLATED, -MAX_WBITS, DEF_MEM_LEVEL, Z_DEFAULT_STRATEGY if strategy is None else strategy)
+    return b''.join([_gzip_header(compresslevel), compressor.compress(data), compressor.flush(), pack('<II', crc32(data) & 0xffffffff, len(data) & 0xffffffff)])
+
+def _executor_class(name):
+    '''Return the named class of concurrent.futures, which is only imported when needed, or None.'''
+    try:
+        import concurrent.futures
+    except ImportError: # Python 2 without the futures backport
+        return None
+    return getattr(concurrent.futures, name)
+
+class _ParallelGzipWriter(object):
+    '''Write each block of block_size bytes as separate gzip member, compressing the blocks in a thread pool.
+
+    zlib releases the GIL while compressing, so the blocks are compressed in parallel.
+    '''
+
+    def __init__(self, output_stream, gzip_options):
+        self._output_stream = output_stream
+        self._compress_block = partial(_gzip_member, compresslevel=gzip_options.compresslevel, strategy=gzip_options.strategy)
+        self._block_size = gzip_options.block_size
+        self._max_pending = 2 * gzip_options.threads
+        thread_pool_executor = _executor_class('ThreadPoolExecutor')
+        self._executor = None if thread_pool_executor is None else thread_pool_executor(max_workers=gzip_options.threads)
+        self._pending = deque()
+        self._buffer = []
+        self._buffered_size = 0
+        self._block_count = 0
+
+    def write(self, data):
+        self._buffer.append(data)
+        self._buffered_size += len(data)
+        if self._buffered_size >= self._block_size:
+            self._submit_blocks(final=False)
+        return len(data)
+
+    def _submit_blocks(self, final):
+        data = b''.join(self._buffer)
+        start = 0
+        while len(data) - start >= self._block_size or (final and start < len(data)):
+            self._submit(data[start:start + self._block_size])
+            start += self._block_size
+        self._buffer = [data[start:]]
+        self._buffered_size = len(data) - start
+
+    def _submit(self, block):
+        self._block_count += 1
+        if self._executor is None: # Python 2 without the futures backport
+            self._output_stream.write(self._compress_block(block))
+            return
+        self._pending.append(self._executor.submit(self._compress_block, block))
+        while len(self._pending) > self._max_pending:
+            self._output_stream.write(self._pending.popleft().result())
+
+    def close(self):
+        if self._buffer is None:
+            return
+        try:
+            self._submit_blocks(final=True)
+            if self._block_count == 0: # At least one member is required
+                self._submit(b'')
+            while self._pending:
+                self._output_stream.write(self._pending.popleft().result())
+        finally:
+            self._buffer = None
+            if self._executor is not None:
+                self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def _gzipfile(output_stream, gzip_options=None):
+    if gzip_options is None:
+        gzip_options = _DEFAULT_GZIP_OPTIONS
+    if gzip_options.threads > 1:
+        return _ParallelGzipWriter(output_stream, gzip_options)
+    return _GzipWriter(output_stream, gzip_options)
+
+def _raise_toplevel_error():
+    raise ValueError('For security reasons, refusing to handle JSON data whose toplevel is not a JSON object')
 
 def _check_toplevel_jsondata(jsondata):
     if not isinstance(jsondata, dict):
-        raise ValueError('For security reasons, refusing to handle JSON data whose toplevel is not a JSON object')
+        _raise_toplevel_error()
 
 def _check_json_key(key):
     if isinstance(key, str):
         return str(key)
     raise ValueError('Invalid key for JSON object structure: {!r}'.format(key))
 
-def _from_jsondata_typed(result_type, jsondata):
-    if jsondata is None:
+_COMPILED_CACHE_MAXSIZE = 1024
+
+_decoder_cache = {}
+
+def _compiled(cache, key, compile_function, *args):
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    except TypeError: # unhashable type annotation, compile without caching
+        return compile_function(*args)
+    if len(cache) >= _COMPILED_CACHE_MAXSIZE:
+        cache.clear()
+    compiled_cell = []
+    def compiled_later(*call_args): # Used by recursive types, such as List['Node'] within Node
+        return compiled_cell[0](*call_args)
+    cache[key] = compiled_later
+    try:
+        compiled = compile_function(*args)
+    except BaseException:
+        if cache.get(key) is compiled_later:
+            del cache[key]
+        raise
+    compiled_cell.append(compiled)
+    cache[key] = compiled
+    return compiled
+
+_profiler = None
+
+_profiled_decoder_cache = {}
+
+_profiled_encoder_cache = {}
+
+_profiled_writer_cache = {}
+
+def _type_name(some_type):
+    if some_type is None:
+        return 'untyped'
+    if isinstance(some_type, type) and _type_origin(some_type) is None:
+        return some_type.__name__
+    return repr(some_type)
+
+class Profiler(object):
+    '''Collect call counts and cumulative times per type and per NamedTuple field, and I/O statistics.
+
+    Install it via set_profiler(), or use it as context manager. The times of nested types are
+    included in the times of their enclosing types. Byte counts of "gzip" and "gunzip" refer to
+    the uncompressed data.
+    '''
+
+    def __init__(self):
+        self.call_stats = {} # (operation, value_type, field or None) -> [calls, seconds]
+        self.io_stats = {} # name -> [calls, bytes, seconds]
+        self._previous_profiler = None
+
+    def record_call(self, operation, value_type, field, seconds):
+        stats = self.call_stats.setdefault((operation, value_type, field), [0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+
+    def record_io(self, name, byte_count, seconds):
+        stats = self.io_stats.setdefault(name, [0, 0, 0.0])
+        stats[0] += 1
+        stats[1] += byte_count
+        stats[2] += seconds
+
+    def report(self, limit=20, output_stream=None):
+        '''Print the types and fields with the highest cumulative times, followed by the I/O statistics.'''
+        rows = sorted(self.call_stats.items(), key=lambda key_stats: -key_stats[1][1])
+        for title, is_field in [('type', False), ('field', True)]:
+            print('{:<8} {:>10} {:>10}  {}'.format('', 'calls', 'seconds', title), file=output_stream)
+            for (operation, value_type, field), (calls, seconds) in [row for row in rows if (row[0][2] is not None) == is_field][:limit]:
+                name = _type_name(value_type) if field is None else '{}.{}'.format(_type_name(value_type), field)
+                print('{:<8} {:>10} {:>10.6f}  {}'.format(operation, calls, seconds, name), file=output_stream)
+        print('{:<8} {:>10} {:>10} {:>12}'.format('', 'calls', 'seconds', 'bytes'), file=output_stream)
+        for name, (calls, byte_count, seconds) in sorted(self.io_stats.items()):
+            print('{:<8} {:>10} {:>10.6f} {:>12}'.format(name, calls, seconds, byte_count), file=output_stream)
+
+    def __enter__(self):
+        self._previous_profiler = set_profiler(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        set_profiler(self._previous_profiler)
+
+def set_profiler(profiler):
+    '''Install profiler, e.g. a Profiler instance, or uninstall it with None. Return the previous profiler.
+
+    While a profiler is installed, instrumented decoders, encoders and writers are used, which report
+    their calls via profiler.record_call(operation, value_type, field, seconds). The I/O functions
+    report via profiler.record_io(name, byte_count, seconds). Without profiler, there is no overhead.
+    '''
+    global _profiler
+    previous_profiler = _profiler
+    _profiler = profiler
+    return previous_profiler
+
+def _profiled(operation, value_type, field, function):
+    def profiled(*args):
+        start_time = default_timer()
+        try:
+            return function(*args)
+        finally:
+            profiler = _profiler
+            if profiler is not None:
+                profiler.record_call(operation, value_type, field, default_timer() - start_time)
+    return profiled
+
+def _compile_profiled(operation, compile_function, value_type, *args):
+    return _profiled(operation, value_type, None, compile_function(value_type, *args))
+
+def _profiled_field(operation, value_type, field, function):
+    '''Return function, instrumented for field of value_type if a profiler is installed.'''
+    if _profiler is None:
+        return function
+    return _profiled(operation, value_type, field, function)
+
+class _ProfiledStream(object):
+    '''Report read() and write() calls to the profiler, and delegate everything else to stream.'''
+
+    def __init__(self, stream, name):
+        self._stream = stream
+        self._name = name
+
+    def read(self, *args):
+        start_time = default_timer()
+        data = self._stream.read(*args)
+        self._record(len(data), start_time)
+        return data
+
+    def write(self, data):
+        start_time = default_timer()
+        result = self._stream.write(data)
+        self._record(len(data), start_time)
+        return result
+
+    def _record(self, byte_count, start_time):
+        profiler = _profiler
+        if profiler is not None:
+            profiler.record_io(self._name, byte_count, default_timer() - start_time)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def _profiled_stream(stream, name):
+    if _profiler is None:
+        return stream
+    return _ProfiledStream(stream, name)
+
+_TYPE_ORIGINS = {Dict: Dict, dict: Dict, List: List, list: List, Union: Union}
+
+if _UnionType is not None:
+    _TYPE_ORIGINS[_UnionType] = Union
+
+_type_info_cache = {}
+
+def _compile_namedtuple_field_types(some_type):
+    if not (isinstance(some_type, type) and issubclass(some_type, tuple) and hasattr(some_type, '_fields')):
+        return None
+    field_types = getattr(some_type, '_field_types', None) # Python < 3.9
+    if field_types is not None:
+        return field_types
+    try:
+        annotations = get_type_hints(some_type)
+    except Exception: # Unresolvable forward references are kept as they are
+        annotations = {}
+        for base in reversed(some_type.__mro__):
+            annotations.update(base.__dict__.get('__annotations__', {}))
+    if not all(field in annotations for field in some_type._fields):
+        return None # collections.namedtuple
+    return OrderedDict((field, annotations[field]) for field in some_type._fields)
+
+def _compile_type_info(some_type):
+    '''Return (origin, args, field_types, resolved_type) of some_type.
+
+    The origin is one of Dict, List, Union or None, also for dict[...], list[...] and X | Y.
+    NoneType is removed from the args of unions. Optional[X] resolves to X, whose handlers
+    already accept None, unless X is a NamedTuple that keeps its union tag.
+    '''
+    origin = _get_origin(some_type)
+    origin = None if origin is None else _TYPE_ORIGINS.get(origin)
+    args = () if origin is None else tuple(_get_args(some_type) or ())
+    if not args: # Plain List or Dict
+        origin = None
+    if origin is Union:
+        args = tuple(member_type for member_type in args if member_type is not type(None))
+        if len(args) == 1 and _namedtuple_field_types(args[0]) is None:
+            return _type_info(args[0])
+    return (origin, args, _compile_namedtuple_field_types(some_type), some_type)
+
+def _type_info(some_type):
+    return _compiled(_type_info_cache, some_type, _compile_type_info, some_type)
+
+def _type_origin(some_type):
+    return _type_info(some_type)[0]
+
+def _type_args(some_type):
+    return _type_info(some_type)[1]
+
+def _namedtuple_field_types(some_type):
+    return _type_info(some_type)[2]
+
+def _resolved_type(some_type):
+    return _type_info(some_type)[3]
+
+class InternTable(object):
+    '''Bounded table for deduplicating equal strings when decoding.
+
+    Once maxsize strings are stored, the table is cleared, so its memory usage stays bounded.
+    '''
+
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self._strings = {}
+        self._decoder_cache = {}
+        self._profiled_decoder_cache = {}
+
+    def __len__(self):
+        return len(self._strings)
+
+    def intern(self, value):
+        '''Return the stored string that is equal to value, storing value if there is none.'''
+        strings = self._strings
+        result = strings.get(value)
+        if result is None:
+            if len(strings) >= self.maxsize:
+                strings.clear()
+            strings[value] = result = value
+        return result
+
+_DEFAULT_INTERN_TABLE = InternTable()
+
+def _intern_table(intern):
+    if intern is None or intern is False:
         return None
-    if result_type is bool and isinstance(jsondata, bool):
-        return bool(jsondata)
-    if result_type is int and isinstance(jsondata, Integral):
-        return int(jsondata)
-    if result_type is float and isinstance(jsondata, float):
-        return float(jsondata)
-    if result_type is str and isinstance(jsondata, str):
-        return str(jsondata)
-    if result_type is datetime and isinstance(jsondata, str):
-        if '.' in jsondata:
-            return datetime.strptime(jsondata, _DATETIME_UTC_FORMAT_MICROSECONDS)
-        return datetime.strptime(jsondata, _DATETIME_UTC_FORMAT_SECONDS)
-    if result_type is date and isinstance(jsondata, str):
-        return datetime.strptime(jsondata, _DATE_FORMAT).date()
-    if result_type is timedelta and isinstance(jsondata, float):
-        return timedelta(seconds=jsondata)
-    if hasattr(result_type, '__origin__') and result_type.__origin__ is Dict and isinstance(jsondata, dict):
-        (key_type, value_type) = result_type.__args__
-        if key_type is not str:
-            raise ValueError('Invalid key type for JSON object: {key_type.__name__}'.format(**locals()))
-        return {_check_json_key(key_jsondata): _from_jsondata_typed(value_type, value_jsondata) for key_jsondata, value_jsondata in jsondata.items()}
-    if hasattr(result_type, '__origin__') and result_type.__origin__ is List and isinstance(jsondata, list):
-        (item_type,) = result_type.__args__
-        return [_from_jsondata_typed(item_type, item_jsondata) for item_jsondata in jsondata]
-    if hasattr(result_type, '__origin__') and result_type.__origin__ is Union and isinstance(jsondata, dict):
-        typename = jsondata['type']
-        matching_types = [t for t in result_type.__args__ if t.__name__ == typename]
-        if not matching_types:
-            raise ValueError('Unable to find type {!r} in union {!r}'.format(typename, result_type))
-        if len(matching_types) != 1:
-            raise ValueError('Multiple matching types for {!r}: {!r}'.format(typename, matching_types))
-        matching_type = matching_types[0]
-        reduced_jsondata = {k: v for k, v in jsondata.items() if k != 'type'}
-        return _from_jsondata_typed(matching_type, reduced_jsondata)
-    if isclass(result_type) and issubclass(result_type, tuple) and hasattr(result_type, '_field_types') and isinstance(jsondata, dict) and len(jsondata) == len(result_type._fields): # typing.NamedTuple
-        return result_type(*(_from_jsondata_typed(result_type._field_types[field], jsondata[field]) for field in result_type._fields))
+    if intern is True:
+        return _DEFAULT_INTERN_TABLE
+    if isinstance(intern, InternTable):
+        return intern
+    raise ValueError('Invalid intern argument, expected bool or InternTable: {!r}'.format(intern))
+
+def _raise_from_jsondata_error(result_type, jsondata):
     raise ValueError('Unable to generate instance of {result_type} from JSON data structure: {jsondata!r}'.format(**locals()))
 
-def from_jsondata(result_type, jsondata):
-    return _from_jsondata_typed(result_type, jsondata)
-
-def _to_jsondata_typed(value_type, value):
-    if hasattr(value_type, '__origin__') and value_type.__origin__ is List:
-        (item_type,) = value_type.__args__
-        return [_to_jsondata_typed(item_type, item_value) for item_value in value]
-    if hasattr(value_type, '__origin__') and value_type.__origin__ is Union:
-        plain_jsondata = _to_jsondata_untyped(value)
-        if not isinstance(plain_jsondata, dict):
-            raise ValueError('Unable to handle non-object within union: {!r}'.format(plain_jsondata))
-        jsondata = plain_jsondata.copy()
+def _compile_leaf_decoder(result_type, json_type, convert):
+    def decode(jsondata):
+        if jsondata is None:
+            return None
+        if isinstance(jsondata, json_type):
+            return convert(jsondata)
+        _raise_from_jsondata_error(result_type, jsondata)
+    return decode
+
+def _compile_exact_leaf_decoder(result_type, json_type):
+    '''Like _compile_leaf_decoder(), but return values of exactly result_type as they are.'''
+    def decode(jsondata):
+        if type(jsondata) is result_type:
+            return jsondata
+        if jsondata is None:
+            return None
+        if isinstance(jsondata, json_type):
+            return result_type(jsondata)
+        _raise_from_jsondata_error(result_type, jsondata)
+    return decode
+
+if hasattr(datetime, 'fromisoformat'): # Python 3.7+
+    def _datetime_from_isoformat(jsondata):
+        return datetime.fromisoformat(jsondata[:-1])
+    _date_from_isoformat = date.fromisoformat
+else:
+    def _datetime_from_isoformat(jsondata):
+        microsecond = int(jsondata[20:26]) if len(jsondata) == 27 else 0
+        return datetime(int(jsondata[0:4]), int(jsondata[5:7]), int(jsondata[8:10]), int(jsondata[11:13]), int(jsondata[14:16]), int(jsondata[17:19]), microsecond)
+    def _date_from_isoformat(jsondata):
+        return date(int(jsondata[0:4]), int(jsondata[5:7]), int(jsondata[8:10]))
+
+def _parse_datetime(jsondata):
+    if _DATETIME_UTC_PATTERN.match(jsondata):
+        try:
+            return _datetime_from_isoformat(jsondata)
+        except ValueError:
+            pass # Let strptime report the error
+    if '.' in jsondata:
+        return datetime.strptime(jsondata, _DATETIME_UTC_FORMAT_MICROSECONDS)
+    return datetime.strptime(jsondata, _DATETIME_UTC_FORMAT_SECONDS)
+
+def _parse_date(jsondata):
+    if _DATE_PATTERN.match(jsondata):
+        try:
+            return _date_from_isoformat(jsondata)
+        except ValueError:
+            pass # Let strptime report the error
+    return datetime.strptime(jsondata, _DATE_FORMAT).date()
+
+def _compile_dict_decoder(result_type, intern_table):
+    (key_type, value_type) = _type_args(result_type)
+    decode_value = _compiled_decoder(value_type, intern_table)
+    if key_type is InternedStr and intern_table is None:
+        intern_table = _DEFAULT_INTERN_TABLE
+    def decode(jsondata):
+        if jsondata is None:
+            return None
+        if isinstance(jsondata, dict):
+            if key_type is not str and key_type is not InternedStr:
+                raise ValueError('Invalid key type for JSON object: {key_type.__name__}'.format(key_type=key_type))
+            if intern_table is not None:
+                intern = intern_table.intern
+                return {intern(_check_json_key(key_jsondata)): decode_value(value_jsondata) for key_jsondata, value_jsondata in jsondata.items()}
+            return {_check_json_key(key_jsondata): decode_value(value_jsondata) for key_jsondata, value_jsondata in jsondata.items()}
+        _raise_from_jsondata_error(result_type, jsondata)
+    return decode
+
+def _compile_list_decoder(result_type, intern_table):
+    (item_type,) = _type_args(result_type)
+    decode_item = _compiled_decoder(item_type, intern_table)
+    def decode(jsondata):
+        if jsondata is None:
+            return None
+        if isinstance(jsondata, list):
+            return [decode_item(item_jsondata) for item_jsondata in jsondata]
+        _raise_from_jsondata_error(result_type, jsondata)
+    return decode
+
+def _without_union_tag(jsondata):
+    return {k: v for k, v in jsondata.items() if k != 'type'}
+
+def _compile_ambiguous_variant_decoder(typename, matching_types):
+    def decode(jsondata):
+        raise ValueError('Multiple matching types for {!r}: {!r}'.format(typename, matching_types))
+    return decode
+
+def _compile_variant_decoder(member_type, intern_table):
+    field_types = _namedtuple_field_types(member_type)
+    if field_types is not None and 'type' not in member_type._fields:
+        return _compile_namedtuple_decoder(member_type, field_types, intern_table, tagged=True)
+    decode_member = _compiled_decoder(member_type, intern_table)
+    def decode(jsondata):
+        return decode_member(_without_union_tag(jsondata))
+    return decode
+
+def _compile_union_decoder(result_type, intern_table):
+    members_by_name = {}
+    for member_type in _type_args(result_type):
+        if hasattr(member_type, '__name__'):
+            members_by_name.setdefault(member_type.__name__, []).append(member_type)
+    union_index = {
+        typename: _compile_variant_decoder(matching_types[0], intern_table) if len(matching_types) == 1 else _compile_ambiguous_variant_decoder(typename, matching_types)
+        for typename, matching_types in members_by_name.items()
+    }
+    def decode(jsondata):
+        if jsondata is None:
+            return None
+        if isinstance(jsondata, dict):
+            typename = jsondata['type']
+            try:
+                decode_variant = union_index[typename]
+            except (KeyError, TypeError):
+                raise ValueError('Unable to find type {!r} in union {!r}'.format(typename, result_type))
+            return decode_variant(jsondata)
+        _raise_from_jsondata_error(result_type, jsondata)
+    return decode
+
+def _compile_namedtuple_decoder(result_type, field_types, intern_table, tagged=False):
+    '''Decode JSON objects to the NamedTuple result_type.
+
+    If tagged is set, the JSON object is expected to contain an additional union "type" field, which is ignored.
+    '''
+    field_decoders = [(field, _profiled_field('decode', result_type, field, _compiled_decoder(field_types[field], intern_table))) for field in result_type._fields]
+    field_count = len(field_decoders) + (1 if tagged else 0)
+    def decode(jsondata):
+        if jsondata is None:
+            return None
+        if isinstance(jsondata, dict) and len(jsondata) == field_count:
+            return result_type(*[decode_field(jsondata[field]) for field, decode_field in field_decoders])
+        _raise_from_jsondata_error(result_type, _without_union_tag(jsondata) if tagged else jsondata)
+    return decode
+
+def _compile_unsupported_decoder(result_type):
+    def decode(jsondata):
+        if jsondata is None:
+            return None
+        _raise_from_jsondata_error(result_type, jsondata)
+    return decode
+
+def _compile_decoder(result_type, intern_table):
+    result_type = _resolved_type(result_type)
+    if result_type is bool:
+        return _compile_exact_leaf_decoder(result_type, bool)
+    if result_type is int:
+        return _compile_exact_leaf_decoder(result_type, Integral)
+    if result_type is float:
+        return _compile_exact_leaf_decoder(result_type, float)
+    if result_type is str and intern_table is None:
+        return _compile_exact_leaf_decoder(result_type, str)
+    if result_type is str or result_type is InternedStr:
+        return _compile_leaf_decoder(str, str, (_DEFAULT_INTERN_TABLE if intern_table is None else intern_table).intern)
+    if result_type is datetime:
+        return _compile_leaf_decoder(result_type, str, _parse_datetime)
+    if result_type is date:
+        return _compile_leaf_decoder(result_type, str, _parse_date)
+    if result_type is timedelta:
+        return _compile_leaf_decoder(result_type, float, lambda jsondata: timedelta(seconds=jsondata))
+    origin = _type_origin(result_type)
+    if origin is Dict:
+        return _compile_dict_decoder(result_type, intern_table)
+    if origin is List:
+        return _compile_list_decoder(result_type, intern_table)
+    if origin is Union:
+        return _compile_union_decoder(result_type, intern_table)
+    field_types = _namedtuple_field_types(result_type)
+    if field_types is not None:
+        return _compile_namedtuple_decoder(result_type, field_types, intern_table)
+    return _compile_unsupported_decoder(result_type)
+
+def _compiled_decoder(result_type, intern_table):
+    if intern_table is None:
+        (decoder_cache, profiled_decoder_cache) = (_decoder_cache, _profiled_decoder_cache)
+    else: # Cached with the table, so that tables of callers and their strings can be freed
+        (decoder_cache, profiled_decoder_cache) = (intern_table._decoder_cache, intern_table._profiled_decoder_cache)
+    if _profiler is not None:
+        return _compiled(profiled_decoder_cache, result_type, _compile_profiled, 'decode', _compile_decoder, result_type, intern_table)
+    return _compiled(decoder_cache, result_type, _compile_decoder, result_type, intern_table)
+
+def compile_decoder(result_type, intern=None):
+    '''Return a function that converts JSON data structures to instances of result_type.
+
+    The type analysis happens only once per type, the resulting decoders are cached.
+    With intern=True, all decoded strings and dict keys are deduplicated via a shared
+    InternTable, or via the given InternTable. Fields annotated as InternedStr are always
+    deduplicated.
+    '''
+    return _compiled_decoder(result_type, _intern_table(intern))
+
+def from_jsondata(result_type, jsondata, intern=None):
+    return compile_decoder(result_type, intern)(jsondata)
+
+_lazy_converter_cache = {}
+
+_structure_checker_cache = {}
+
+_MISSING = object()
+
+class _LazyRecord(object):
+    '''Read-only view of a JSON object as NamedTuple, converting and memoizing fields on first access.
+
+    Subclasses are created per NamedTuple type by _compile_lazy_record_class().
+    '''
+
+    __slots__ = ('_jsondata', '_values')
+    _record_type = None
+    _fields = ()
+    _field_converters = ()
+
+    def __init__(self, jsondata):
+        self._jsondata = jsondata
+        self._values = [_MISSING] * len(self._fields)
+
+    def _get(self, index):
+        value = self._values[index]
+        if value is _MISSING:
+            value = self._field_converters[index](self._jsondata[self._fields[index]])
+            self._values[index] = value
+        return value
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __iter__(self):
+        return (self._get(index) for index in range(len(self._fields)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        return self._get(range(len(self._fields))[index])
+
+    def __eq__(self, other):
+        if isinstance(other, (tuple, _LazyRecord)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return '{}({})'.format(self._record_type.__name__, ', '.join('{}={!r}'.format(field, value) for field, value in zip(self._fields, self)))
+
+    def _asdict(self):
+        return OrderedDict(zip(self._fields, self))
+
+    def _materialize(self):
+        '''Return the fully converted NamedTuple instance.'''
+        return self._record_type(*[_materialize(value) for value in self])
+
+class _LazyList(object):
+    '''Read-only view of a JSON array, converting and memoizing items on first access.'''
+
+    __slots__ = ('_jsondata', '_convert', '_values')
+
+    def __init__(self, jsondata, convert):
+        self._jsondata = jsondata
+        self._convert = convert
+        self._values = [_MISSING] * len(jsondata)
+
+    def _get(self, index):
+        value = self._values[index]
+        if value is _MISSING:
+            value = self._convert(self._jsondata[index])
+            self._values[index] = value
+        return value
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return (self._get(index) for index in range(len(self._values)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(len(self._values))[index]]
+        return self._get(range(len(self._values))[index])
+
+    def __eq__(self, other):
+        if isinstance(other, (list, _LazyList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def _materialize(self):
+        '''Return the fully converted list.'''
+        return [_materialize(value) for value in self]
+
+def _materialize(value):
+    if isinstance(value, (_LazyRecord, _LazyList)):
+        return value._materialize()
+    return value
+
+def _compile_lazy_record_class(result_type, field_types):
+    namespace = {
+        '__slots__': (),
+        '_record_type': result_type,
+        '_fields': result_type._fields,
+        '_field_converters': [_compiled_lazy_converter(field_types[field]) for field in result_type._fields],
+    }
+    for index, field in enumerate(result_type._fields):
+        namespace[field] = property(lambda self, index=index: self._get(index))
+    return type(result_type.__name__, (_LazyRecord,), namespace)
+
+def _compile_lazy_namedtuple_converter(result_type, field_types, tagged=False):
+    lazy_record_class = _compile_lazy_record_class(result_type, field_types)
+    field_count = len(result_type._fields) + (1 if tagged else 0)
+    def convert(jsondata):
+        if jsondata is None:
+            return None
+        if isinstance(jsondata, dict) and len(jsondata) == field_count:
+            return lazy_record_class(jsondata)
+        _raise_from_jsondata_error(result_type, _without_union_tag(jsondata) if tagged else jsondata)
+    return convert
+
+def _compile_lazy_union_converter(result_type):
+    type_names = [getattr(member_type, '__name__', None) for member_type in _type_args(result_type)]
+    variant_converters = {}
+    for member_type in _type_args(result_type):
+        field_types = _namedtuple_field_types(member_type)
+        # Ambiguous type names are left to the eager decoder, which reports them
+        if field_types is not None and type_names.count(member_type.__name__) == 1:
+            variant_converters[member_type.__name__] = _compile_lazy_namedtuple_converter(member_type, field_types, tagged=True)
+    decode = compile_decoder(result_type)
+    def convert(jsondata):
+        if isinstance(jsondata, dict):
+            typename = jsondata.get('type')
+            if isinstance(typename, str) and typename in variant_converters:
+                return variant_converters[typename](jsondata)
+        return decode(jsondata)
+    return convert
+
+def _compile_lazy_list_converter(result_type):
+    (item_type,) = _type_args(result_type)
+    convert_item = _compiled_lazy_converter(item_type)
+    def convert(jsondata):
+        if jsondata is None:
+            return None
+        if isinstance(jsondata, list):
+            return _LazyList(jsondata, convert_item)
+        _raise_from_jsondata_error(result_type, jsondata)
+    return convert
+
+def _compile_lazy_converter(result_type):
+    result_type = _resolved_type(result_type)
+    origin = _type_origin(result_type)
+    if origin is List:
+        return _compile_lazy_list_converter(result_type)
+    if origin is Union:
+        return _compile_lazy_union_converter(result_type)
+    field_types = _namedtuple_field_types(result_type)
+    if field_types is not None:
+        return _compile_lazy_namedtuple_converter(result_type, field_types)
+    return compile_decoder(result_type)
+
+def _compiled_lazy_converter(result_type):
+    return _compiled(_lazy_converter_cache, result_type, _compile_lazy_converter, result_type)
+
+def _compile_structure_checker(result_type):
+    '''Return a function that raises the same errors as the decoder of result_type for structural problems.
+
+    Leaf values are only checked for their JSON type, e.g. datetime strings are not parsed.
+    '''
+    result_type = _resolved_type(result_type)
+    json_types = {bool: bool, int: Integral, float: float, str: str, InternedStr: str, datetime: str, date: str, timedelta: float}
+    if result_type in json_types:
+        json_type = json_types[result_type]
+        def check(jsondata):
+            if jsondata is not None and not isinstance(jsondata, json_type):
+                _raise_from_jsondata_error(result_type, jsondata)
+        return check
+    origin = _type_origin(result_type)
+    if origin is Dict:
+        (key_type, value_type) = _type_args(result_type)
+        check_value = _compiled_structure_checker(value_type)
+        def check(jsondata):
+            if jsondata is None:
+                return
+            if not isinstance(jsondata, dict):
+                _raise_from_jsondata_error(result_type, jsondata)
+            if key_type is not str and key_type is not InternedStr:
+                raise ValueError('Invalid key type for JSON object: {key_type.__name__}'.format(key_type=key_type))
+            for value_jsondata in jsondata.values():
+                check_value(value_jsondata)
+        return check
+    if origin is List:
+        (item_type,) = _type_args(result_type)
+        check_item = _compiled_structure_checker(item_type)
+        def check(jsondata):
+            if jsondata is None:
+                return
+            if not isinstance(jsondata, list):
+                _raise_from_jsondata_error(result_type, jsondata)
+            for item_jsondata in jsondata:
+                check_item(item_jsondata)
+        return check
+    if origin is Union:
+        members_by_name = {}
+        for member_type in _type_args(result_type):
+            if hasattr(member_type, '__name__'):
+                members_by_name.setdefault(member_type.__name__, []).append(member_type)
+        def check(jsondata):
+            if jsondata is None:
+                return
+            if not isinstance(jsondata, dict):
+                _raise_from_jsondata_error(result_type, jsondata)
+            typename = jsondata['type']
+            matching_types = members_by_name.get(typename, []) if isinstance(typename, str) else []
+            if len(matching_types) != 1:
+                compile_decoder(result_type)(jsondata) # Reports the error
+            _compiled_structure_checker(matching_types[0])(_without_union_tag(jsondata))
+        return check
+    field_types = _namedtuple_field_types(result_type)
+    if field_types is not None:
+        field_checkers = [(field, _compiled_structure_checker(field_types[field])) for field in result_type._fields]
+        def check(jsondata):
+            if jsondata is None:
+                return
+            if not isinstance(jsondata, dict) or len(jsondata) != len(field_checkers):
+                _raise_from_jsondata_error(result_type, jsondata)
+            for field, check_field in field_checkers:
+                check_field(jsondata[field])
+        return check
+    return compile_decoder(result_type)
+
+def _compiled_structure_checker(result_type):
+    return _compiled(_structure_checker_cache, result_type, _compile_structure_checker, result_type)
+
+def from_jsondata_lazy(result_type, jsondata, validate='eager'):
+    '''Like from_jsondata(), but return views that convert nested NamedTuples and list items on first access.
+
+    NamedTuples are represented by read-only objects that support attribute access, indexing,
+    equality and _asdict(). Call _materialize() to obtain the fully converted instance.
+    With validate='eager', the structure of the whole JSON data is checked up front, so
+    only errors in leaf values such as invalid dates can occur later. With validate='deferred',
+    nothing is checked until the respective part is accessed.
+    '''
+    if validate == 'eager':
+        _compiled_structure_checker(result_type)(jsondata)
+    elif validate != 'deferred':
+        raise ValueError('Invalid validation mode: {!r}'.format(validate))
+    return _compiled_lazy_converter(result_type)(jsondata)
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _timedelta_microseconds(value):
+    return (value.days * 86400 + value.seconds) * 1000000 + value.microseconds
+
+def _column_codec(value_type):
+    '''Return (typecode, to_number, from_number) for storing values of value_type in an array, or None.'''
+    if value_type is bool:
+        return ('b', int, bool)
+    if value_type is int:
+        return (_INT64_TYPECODE, None, None)
+    if value_type is float:
+        return ('d', None, None)
+    if value_type is datetime:
+        return (_INT64_TYPECODE, lambda value: _timedelta_microseconds(value - _EPOCH), lambda number: _EPOCH + timedelta(microseconds=number))
+    if value_type is date:
+        return (_INT64_TYPECODE, date.toordinal, date.fromordinal)
+    if value_type is timedelta:
+        return (_INT64_TYPECODE, _timedelta_microseconds, lambda number: timedelta(microseconds=number))
+    return None
+
+def _decode_column(jsondata_list, field, field_type):
+    '''Return the column of decoded values and a function converting its entries back to values.'''
+    decode = compile_decoder(field_type)
+    codec = _column_codec(field_type)
+    if codec is not None:
+        (typecode, to_number, from_number) = codec
+        column = array(typecode)
+        try:
+            for item_jsondata in jsondata_list:
+                value = decode(item_jsondata[field])
+                column.append(value if to_number is None else to_number(value))
+        except (TypeError, OverflowError): # Null, or number out of range
+            pass
+        else:
+            return (column, from_number)
+    return ([decode(item_jsondata[field]) for item_jsondata in jsondata_list], None)
+
+class ColumnarList(object):
+    '''Read-only list of NamedTuples of item_type, stored as one column per field.
+
+    Columns of bool, int, float, datetime, date and timedelta fields are stored as array.array,
+    datetimes as microseconds since the epoch, dates as ordinals and timedeltas as microseconds.
+    Columns containing nulls or integers beyond 64 bit, and columns of other types, are stored
+    as lists. Items are created on access.
+    '''
+
+    def __init__(self, item_type, columns, from_numbers):
+        self.item_type = item_type
+        self.columns = columns
+        self._column_getters = [
+            column.__getitem__ if from_number is None else (lambda index, column=column, from_number=from_number: from_number(column[index]))
+            for column, from_number in zip(columns.values(), from_numbers)
+        ]
+        self._length = len(next(iter(columns.values())))
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(self._length)[index]]
+        index = range(self._length)[index]
+        return self.item_type(*[get(index) for get in self._column_getters])
+
+    def __iter__(self):
+        return (self[index] for index in range(self._length))
+
+    def __eq__(self, other):
+        if isinstance(other, (list, ColumnarList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'ColumnarList({!r}, {!r})'.format(self.item_type, list(self))
+
+def from_jsondata_columnar(item_type, jsondata):
+    '''Convert a JSON array of objects to a ColumnarList of the NamedTuple item_type.
+
+    NamedTuples without fields are returned as plain list.
+    '''
+    field_types = _namedtuple_field_types(item_type)
+    if field_types is None:
+        raise ValueError('Unable to store non-NamedTuple type in columnar list: {!r}'.format(item_type))
+    if not isinstance(jsondata, list):
+        _raise_from_jsondata_error(List[item_type], jsondata)
+    for item_jsondata in jsondata:
+        if not isinstance(item_jsondata, dict) or len(item_jsondata) != len(item_type._fields):
+            _raise_from_jsondata_error(item_type, item_jsondata)
+    if not item_type._fields:
+        return [item_type() for _ in jsondata]
+    columns = OrderedDict()
+    from_numbers = []
+    for field in item_type._fields:
+        (columns[field], from_number) = _decode_column(jsondata, field, field_types[field])
+        from_numbers.append(from_number)
+    return ColumnarList(item_type, columns, from_numbers)
+
+_validator_cache = {}
+
+_VALIDATOR_SIGNATURES_MAXSIZE = 1024
+
+# Subsets of _DATE_PATTERN and _DATETIME_UTC_PATTERN that are valid for every month
+_VALID_DATE_PATTERN = re_compile('(?!0000)[0-9]{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|1[0-9]|2[0-8])\\Z')
+_VALID_DATETIME_UTC_PATTERN = re_compile('(?!0000)[0-9]{4}-(?:0[1-9]|1[0-2])-(?:0[1-9]|1[0-9]|2[0-8])T(?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9](?:\\.[0-9]{6})?Z\\Z')
+
+ValidationError = NamedTuple('ValidationError', [
+    ('path', str),
+    ('message', str),
+])
+
+# Validators return None for valid JSON data, and otherwise a list of errors. Each error is
+# a list of the message followed by the keys of the path in reverse order, which are only
+# added while returning from the nested validators, so valid data needs no path handling.
+
+def _jsondata_error_message(result_type, jsondata):
+    return 'Unable to generate instance of {result_type} from JSON data structure: {jsondata!r}'.format(**locals())
+
+def _add_error_key(errors, key):
+    for error in errors:
+        error.append(key)
+    return errors
+
+def _leaf_json_type(result_type):
+    '''Return the JSON type of result_type if its values need no further checks, or None.'''
+    return {bool: bool, int: Integral, float: float, str: str, InternedStr: str, timedelta: float}.get(result_type)
+
+def _valid_leaf_types(types, json_types):
+    return all(value_type is type(None) or issubclass(value_type, json_type) for value_type, json_type in zip(types, json_types))
+
+def _compile_leaf_validator(result_type, json_type):
+    def validate(jsondata):
+        if jsondata is None or isinstance(jsondata, json_type):
+            return None
+        return [[_jsondata_error_message(result_type, jsondata)]]
+    return validate
+
+def _compile_parsed_leaf_validator(result_type, valid_pattern, parse):
+    match_valid = valid_pattern.match
+    def validate(jsondata):
+        if jsondata is None:
+            return None
+        if not isinstance(jsondata, str):
+            return [[_jsondata_error_message(result_type, jsondata)]]
+        if match_valid(jsondata):
+            return None
+        try:
+            parse(jsondata)
+        except ValueError as e:
+            return [[str(e)]]
+        return None
+    return validate
+
+def _compile_dict_validator(result_type):
+    (key_type, value_type) = _type_args(result_type)
+    validate_value = _compiled_validator(value_type)
+    def validate(jsondata):
+        if jsondata is None:
+            return None
+        if not isinstance(jsondata, dict):
+            return [[_jsondata_error_message(result_type, jsondata)]]
+        if key_type is not str and key_type is not InternedStr:
+            return [['Invalid key type for JSON object: {key_type.__name__}'.format(key_type=key_type)]]
+        errors = None
+        for key, value_jsondata in jsondata.items():
+            value_errors = validate_value(value_jsondata)
+            if value_errors is not None:
+                errors = (errors or []) + _add_error_key(value_errors, key)
+        return errors
+    return validate
+
+def _compile_list_validator(result_type):
+    (item_type,) = _type_args(result_type)
+    validate_item = _compiled_validator(item_type)
+    item_json_types = (_leaf_json_type(item_type),)
+    def validate(jsondata):
+        if jsondata is None:
+            return None
+        if not isinstance(jsondata, list):
+            return [[_jsondata_error_message(result_type, jsondata)]]
+        if item_json_types[0] is not None and all(_valid_leaf_types((value_type,), item_json_types) for value_type in set(map(type, jsondata))):
+            return None
+        errors = None
+        for index, item_jsondata in enumerate(jsondata):
+            item_errors = validate_item(item_jsondata)
+            if item_errors is not None:
+                errors = (errors or []) + _add_error_key(item_errors, index)
+        return errors
+    return validate
+
+def _compile_union_validator(result_type):
+    members_by_name = {}
+    for member_type in _type_args(result_type):
+        if hasattr(member_type, '__name__'):
+            members_by_name.setdefault(member_type.__name__, []).append(member_type)
+    def compile_ambiguous_validator(typename, matching_types):
+        message = 'Multiple matching types for {!r}: {!r}'.format(typename, matching_types)
+        return lambda jsondata: [[message]]
+    def compile_variant_validator(member_type):
+        field_types = _namedtuple_field_types(member_type)
+        if field_types is not None and 'type' not in member_type._fields:
+            return _compile_namedtuple_validator(member_type, field_types, tagged=True)
+        validate_member = _compiled_validator(member_type)
+        return lambda jsondata: validate_member(_without_union_tag(jsondata))
+    union_index = {
+        typename: compile_variant_validator(matching_types[0]) if len(matching_types) == 1 else compile_ambiguous_validator(typename, matching_types)
+        for typename, matching_types in members_by_name.items()
+    }
+    def validate(jsondata):
+        if jsondata is None:
+            return None
+        if not isinstance(jsondata, dict):
+            return [[_jsondata_error_message(result_type, jsondata)]]
+        typename = jsondata.get('type')
+        try:
+            validate_variant = union_index[typename]
+        except (KeyError, TypeError):
+            return [['Unable to find type {!r} in union {!r}'.format(typename, result_type)]]
+        return validate_variant(jsondata)
+    return validate
+
+def _compile_namedtuple_validator(result_type, field_types, tagged=False):
+    '''Validate JSON objects for the NamedTuple result_type.
+
+    Fields that only need a type check are checked together: The tuple of their value types is
+    looked up in the set of known valid combinations, so the common case needs no per-field calls.
+    '''
+    leaf_fields = [field for field in result_type._fields if _leaf_json_type(field_types[field]) is not None]
+    leaf_json_types = [_leaf_json_type(field_types[field]) for field in leaf_fields]
+    other_validators = [(field, _compiled_validator(field_types[field])) for field in result_type._fields if field not in leaf_fields]
+    field_validators = [(field, _compiled_validator(field_types[field])) for field in result_type._fields]
+    field_count = len(field_validators) + (1 if tagged else 0)
+    if len(leaf_fields) == 1:
+        (leaf_field,) = leaf_fields
+        get_leaf_values = lambda jsondata: (jsondata[leaf_field],)
+    elif leaf_fields:
+        get_leaf_values = itemgetter(*leaf_fields)
+    else:
+        get_leaf_values = lambda jsondata: ()
+    valid_signatures = set()
+    def validate_fields(jsondata, validators, errors):
+        for field, validate_field in validators:
+            if field in jsondata:
+                field_errors = validate_field(jsondata[field])
+            elif errors is None or len(jsondata) == field_count:
+                field_errors = [['Missing field']]
+            else:
+                field_errors = None # Already reported as wrong number of fields
+            if field_errors is not None:
+                errors = (errors or []) + _add_error_key(field_errors, field)
+        return errors
+    def validate(jsondata):
+        if jsondata is None:
+            return None
+        if not isinstance(jsondata, dict):
+            return [[_jsondata_error_message(result_type, jsondata)]]
+        if len(jsondata) != field_count:
+            errors = [[_jsondata_error_message(result_type, _without_union_tag(jsondata) if tagged else jsondata)]]
+            return validate_fields(jsondata, field_validators, errors)
+        try:
+            signature = tuple(map(type, get_leaf_values(jsondata)))
+        except KeyError:
+            return validate_fields(jsondata, field_validators, None)
+        if signature not in valid_signatures:
+            if not _valid_leaf_types(signature, leaf_json_types):
+                return validate_fields(jsondata, field_validators, None)
+            if len(valid_signatures) < _VALIDATOR_SIGNATURES_MAXSIZE:
+                valid_signatures.add(signature)
+        if not other_validators:
+            return None
+        return validate_fields(jsondata, other_validators, None)
+    return validate
+
+def _compile_validator(result_type):
+    result_type = _resolved_type(result_type)
+    json_type = _leaf_json_type(result_type)
+    if json_type is not None:
+        return _compile_leaf_validator(result_type, json_type)
+    if result_type is datetime:
+        return _compile_parsed_leaf_validator(result_type, _VALID_DATETIME_UTC_PATTERN, _parse_datetime)
+    if result_type is date:
+        return _compile_parsed_leaf_validator(result_type, _VALID_DATE_PATTERN, _parse_date)
+    origin = _type_origin(result_type)
+    if origin is Dict:
+        return _compile_dict_validator(result_type)
+    if origin is List:
+        return _compile_list_validator(result_type)
+    if origin is Union:
+        return _compile_union_validator(result_type)
+    field_types = _namedtuple_field_types(result_type)
+    if field_types is not None:
+        return _compile_namedtuple_validator(result_type, field_types)
+    return _compile_leaf_validator(result_type, type(None)) # Unsupported types only accept null
+
+def _compiled_validator(result_type):
+    return _compiled(_validator_cache, result_type, _compile_validator, result_type)
+
+def _json_pointer(keys):
+    return ''.join('/' + str(key).replace('~', '~0').replace('/', '~1') for key in keys)
+
+def validate_jsondata(result_type, jsondata):
+    '''Check whether from_jsondata() would accept jsondata, without creating any instances.
+
+    Return a list of all errors as ValidationError with a JSON pointer to the offending value,
+    which is empty if jsondata is valid.
+    '''
+    errors = _compiled_validator(result_type)(jsondata)
+    if errors is None:
+        return []
+    return [ValidationError(path=_json_pointer(reversed(error[1:])), message=error[0]) for error in errors]
+
+_encoder_cache = {}
+
+def _format_datetime(value):
+    if type(value) is datetime and value.tzinfo is None and value.year >= 1000:
+        return value.isoformat() + 'Z'
+    if value.microsecond == 0:
+        return str(value.strftime(_DATETIME_UTC_FORMAT_SECONDS))
+    return str(value.strftime(_DATETIME_UTC_FORMAT_MICROSECONDS))
+
+def _format_date(value):
+    if type(value) is date and value.year >= 1000:
+        return str(value.isoformat())
+    return str(value.strftime(_DATE_FORMAT))
+
+def _compile_leaf_encoder(value_type, convert):
+    def encode(value):
+        if type(value) is value_type:
+            return convert(value)
+        return _to_jsondata_untyped(value)
+    return encode
+
+def _compile_list_encoder(value_type):
+    (item_type,) = _type_args(value_type)
+    encode_item = compile_encoder(item_type)
+    def encode(value):
+        if value is None:
+            return None
+        return [encode_item(item_value) for item_value in value]
+    return encode
+
+def _add_union_tag(plain_jsondata, typename):
+    if not isinstance(plain_jsondata, dict):
+        raise ValueError('Unable to handle non-object within union: {!r}'.format(plain_jsondata))
+    if 'type' in plain_jsondata:
+        raise ValueError('Unable to add "type" field, because it is already present: {!r}'.format(plain_jsondata))
+    jsondata = plain_jsondata.copy()
+    jsondata['type'] = typename
+    return jsondata
+
+def _compile_union_encoder(value_type):
+    variants = {
+        member_type: (str(member_type.__name__), compile_encoder(member_type))
+        for member_type in _type_args(value_type)
+        if _namedtuple_field_types(member_type) is not None
+    }
+    def encode(value):
+        if value is None:
+            return None
+        try:
+            (typename, encode_variant) = variants[type(value)]
+        except KeyError:
+            return _add_union_tag(_to_jsondata_untyped(value), str(value.__class__.__name__))
+        jsondata = encode_variant(value)
         if 'type' in jsondata:
-            raise ValueError('Unable to add "type" field, because it is already present: {!r}'.format(plain_jsondata))
-        jsondata['type'] = str(value.__class__.__name__)
+            raise ValueError('Unable to add "type" field, because it is already present: {!r}'.format(jsondata))
+        jsondata['type'] = typename
         return jsondata
-    return _to_jsondata_untyped(value)
+    return encode
+
+def _compile_namedtuple_encoder(value_type, field_types):
+    keys = [str(field) for field in value_type._fields]
+    field_encoders = [_profiled_field('encode', value_type, field, compile_encoder(field_types[field])) for field in value_type._fields]
+    def encode(value):
+        if isinstance(value, value_type):
+            return OrderedDict(zip(keys, [encode_field(field_value) for encode_field, field_value in zip(field_encoders, value)]))
+        return _to_jsondata_untyped(value)
+    return encode
+
+def _compile_encoder(value_type):
+    value_type = _resolved_type(value_type)
+    if value_type in (bool, int, float, str):
+        return _compile_leaf_encoder(value_type, lambda value: value)
+    if value_type is InternedStr:
+        return compile_encoder(str)
+    if value_type is datetime:
+        return _compile_leaf_encoder(value_type, _format_datetime)
+    if value_type is date:
+        return _compile_leaf_encoder(value_type, _format_date)
+    origin = _type_origin(value_type)
+    if origin is List:
+        return _compile_list_encoder(value_type)
+    if origin is Union:
+        return _compile_union_encoder(value_type)
+    field_types = _namedtuple_field_types(value_type)
+    if field_types is not None:
+        return _compile_namedtuple_encoder(value_type, field_types)
+    return _to_jsondata_untyped
+
+def compile_encoder(value_type):
+    '''Return a function that converts values annotated as value_type to JSON data structures.
+
+    The type analysis happens only once per type, the resulting encoders are cached.
+    '''
+    if _profiler is not None:
+        return _compiled(_profiled_encoder_cache, value_type, _compile_profiled, 'encode', _compile_encoder, value_type)
+    return _compiled(_encoder_cache, value_type, _compile_encoder, value_type)
 
 def _to_jsondata_untyped(value):
     if value is None:
@@ -117,59 +1383,1061 @@ def _to_jsondata_untyped(value):
     if isinstance(value, str):
         return str(value)
     if isinstance(value, datetime):
-        if value.microsecond == 0:
-            return str(value.strftime(_DATETIME_UTC_FORMAT_SECONDS))
-        return str(value.strftime(_DATETIME_UTC_FORMAT_MICROSECONDS))
+        return _format_datetime(value)
     if isinstance(value, date):
-        return str(value.strftime(_DATE_FORMAT))
+        return _format_date(value)
     if isinstance(value, timedelta):
         return value.total_seconds()
-    if isinstance(value, tuple) and hasattr(value, '_field_types'): # typing.NamedTuple
-        return OrderedDict(
-            (str(field), _to_jsondata_typed(value._field_types[field], getattr(value, field)))
-            for field in value._fields
-        )
+    if isinstance(value, tuple) and _namedtuple_field_types(type(value)) is not None: # typing.NamedTuple
+        return compile_encoder(value.__class__)(value)
     if isinstance(value, list):
         return [_to_jsondata_untyped(item) for item in value]
     if isinstance(value, dict):
         return OrderedDict((_check_json_key(key), _to_jsondata_untyped(item)) for key, item in value.items())
+    if isinstance(value, (_LazyRecord, _LazyList)):
+        return _to_jsondata_untyped(value._materialize())
+    if isinstance(value, ColumnarList):
+        return [_to_jsondata_untyped(item) for item in value]
     raise ValueError('Unable to convert value to JSON data structure: {!r}'.format(value))
 
-def to_jsondata(value):
+def to_jsondata(value, value_type=None):
     '''Convert value to a structure that consists exclusively of JSON types.
 
     These JSON types are: NoneType, bool, int/long, float, str (Python 2: unicode), list, OrderedDict
+
+    If value_type is given, the conversion is driven by this type annotation (see compile_encoder).
     '''
-    jsondata = _to_jsondata_untyped(value)
-    return jsondata
+    value = _materialize(value)
+    if value_type is None:
+        return _to_jsondata_untyped(value)
+    return compile_encoder(value_type)(value)
+
+_writer_cache = {}
+
+class _JsonTextOutput(object):
+    '''Collect pieces of JSON text, which are written to the output stream as UTF-8 in larger blocks.'''
+
+    def __init__(self, output_stream):
+        self.pieces = []
+        self.append = self.pieces.append
+        self._output_stream = output_stream
+
+    def flush_if_full(self):
+        if len(self.pieces) >= _WRITE_FLUSH_PIECES:
+            self.flush()
+
+    def flush(self):
+        self._output_stream.write(''.join(self.pieces).encode('utf-8'))
+        del self.pieces[:]
+
+def _json_float(value):
+    if value != value:
+        return 'NaN'
+    if value == _INFINITY:
+        return 'Infinity'
+    if value == -_INFINITY:
+        return '-Infinity'
+    return float.__repr__(value)
+
+def _json_formatting(compact):
+    '''Return the indentation unit and key separator, which produce the same text as _json_format().'''
+    if compact:
+        return ('', ':')
+    return ('  ', ': ')
+
+def _write_items(write_item, items, out, indent, indent_unit):
+    item_indent = indent + indent_unit
+    separator = '['
+    for item in items:
+        out.append(separator + item_indent)
+        separator = ','
+        write_item(item, out, item_indent)
+        out.flush_if_full()
+    out.append('[]' if separator == '[' else indent + ']')
+
+def _write_members(members, out, indent, indent_unit):
+    member_indent = indent + indent_unit
+    separator = '{'
+    for (key_text, write_member, member_value) in members:
+        out.append(separator + member_indent + key_text)
+        separator = ','
+        write_member(member_value, out, member_indent)
+    out.append('{}' if separator == '{' else indent + '}')
+
+def _compile_untyped_writer(compact, sort_keys):
+    (indent_unit, key_separator) = _json_formatting(compact)
+    def write(value, out, indent):
+        if value is None:
+            out.append('null')
+        elif isinstance(value, bool):
+            out.append('true' if value else 'false')
+        elif isinstance(value, Integral):
+            out.append('%d' % int(value))
+        elif isinstance(value, float):
+            out.append(_json_float(float(value)))
+        elif isinstance(value, str):
+            out.append(_json_string(value))
+        elif isinstance(value, datetime):
+            out.append(_json_string(_format_datetime(value)))
+        elif isinstance(value, date):
+            out.append(_json_string(_format_date(value)))
+        elif isinstance(value, timedelta):
+            out.append(_json_float(value.total_seconds()))
+        elif isinstance(value, tuple) and _namedtuple_field_types(type(value)) is not None: # typing.NamedTuple
+            _compiled_writer(value.__class__, compact, sort_keys)(value, out, indent)
+        elif isinstance(value, list):
+            _write_items(write, value, out, indent, indent_unit)
+        elif isinstance(value, dict):
+            items = [(_check_json_key(key), item) for key, item in value.items()]
+            if sort_keys:
+                items.sort(key=lambda key_item: key_item[0])
+            _write_members([(_json_string(key) + key_separator, write, item) for key, item in items], out, indent, indent_unit)
+        elif isinstance(value, (_LazyRecord, _LazyList)):
+            write(value._materialize(), out, indent)
+        elif isinstance(value, ColumnarList):
+            _write_items(write, value, out, indent, indent_unit)
+        else:
+            raise ValueError('Unable to convert value to JSON data structure: {!r}'.format(value))
+    return write
+
+def _compile_leaf_writer(value_type, text, write_untyped):
+    def write(value, out, indent):
+        if type(value) is value_type:
+            out.append(text(value))
+        else:
+            write_untyped(value, out, indent)
+    return write
+
+def _compile_list_writer(value_type, compact, sort_keys):
+    (item_type,) = _type_args(value_type)
+    write_item = _compiled_writer(item_type, compact, sort_keys)
+    (indent_unit, key_separator) = _json_formatting(compact)
+    def write(value, out, indent):
+        if value is None:
+            out.append('null')
+        else:
+            _write_items(write_item, value, out, indent, indent_unit)
+    return write
+
+def _compile_union_writer(value_type, compact, sort_keys):
+    variant_writers = {
+        member_type: _compile_namedtuple_writer(member_type, _namedtuple_field_types(member_type), compact, sort_keys, tagged=True)
+        for member_type in _type_args(value_type)
+        if _namedtuple_field_types(member_type) is not None and 'type' not in member_type._fields
+    }
+    encode = compile_encoder(value_type)
+    write_jsondata = _compiled_writer(None, compact, sort_keys)
+    def write(value, out, indent):
+        write_variant = variant_writers.get(type(value))
+        if write_variant is None:
+            write_jsondata(encode(value), out, indent) # Reports errors just like to_jsondata()
+        else:
+            write_variant(value, out, indent)
+    return write
+
+def _write_constant(text):
+    def write(value, out, indent):
+        out.append(text)
+    return write
+
+def _compile_namedtuple_writer(value_type, field_types, compact, sort_keys, tagged=False):
+    '''Write NamedTuple instances of exactly value_type, or of any subclass unless tagged is set.
+
+    If tagged is set, the union "type" field is added.
+    '''
+    (indent_unit, key_separator) = _json_formatting(compact)
+    fields = [(str(field), index, _profiled_field('write', value_type, field, _compiled_writer(field_types[field], compact, sort_keys))) for index, field in enumerate(value_type._fields)]
+    if tagged:
+        fields.append(('type', None, _write_constant(_json_string(str(value_type.__name__)))))
+    if sort_keys:
+        fields.sort(key=lambda field: field[0])
+    member_writers = [(_json_string(key) + key_separator, index, write_member) for key, index, write_member in fields]
+    write_untyped = _compiled_writer(None, compact, sort_keys)
+    def write(value, out, indent):
+        if type(value) is not value_type and (tagged or not isinstance(value, value_type)):
+            write_untyped(value, out, indent)
+            return
+        _write_members([(key_text, write_member, None if index is None else value[index]) for key_text, index, write_member in member_writers], out, indent, indent_unit)
+    return write
+
+def _compile_writer(value_type, compact, sort_keys):
+    value_type = _resolved_type(value_type)
+    write_untyped = _compile_untyped_writer(compact, sort_keys) if value_type is None else _compiled_writer(None, compact, sort_keys)
+    if value_type is None:
+        return write_untyped
+    if value_type is bool:
+        return _compile_leaf_writer(value_type, lambda value: 'true' if value else 'false', write_untyped)
+    if value_type is int:
+        return _compile_leaf_writer(value_type, lambda value: '%d' % value, write_untyped)
+    if value_type is float:
+        return _compile_leaf_writer(value_type, _json_float, write_untyped)
+    if value_type is str:
+        return _compile_leaf_writer(value_type, _json_string, write_untyped)
+    if value_type is InternedStr:
+        return _compiled_writer(str, compact, sort_keys)
+    if value_type is datetime:
+        return _compile_leaf_writer(value_type, lambda value: _json_string(_format_datetime(value)), write_untyped)
+    if value_type is date:
+        return _compile_leaf_writer(value_type, lambda value: _json_string(_format_date(value)), write_untyped)
+    origin = _type_origin(value_type)
+    if origin is List:
+        return _compile_list_writer(value_type, compact, sort_keys)
+    if origin is Union:
+        return _compile_union_writer(value_type, compact, sort_keys)
+    field_types = _namedtuple_field_types(value_type)
+    if field_types is not None:
+        return _compile_namedtuple_writer(value_type, field_types, compact, sort_keys)
+    return write_untyped
 
-def write_json(output_stream, value):
-    jsondata = to_jsondata(value)
+def _compiled_writer(value_type, compact, sort_keys):
+    '''Return a function that writes values annotated as value_type as JSON text.
+
+    The result is the same as converting them via compile_encoder() and dumping them with
+    _json_format(), but no intermediate JSON data structure is created. A value_type of None
+    selects the untyped conversion of _to_jsondata_untyped().
+    '''
+    if _profiler is not None:
+        return _compiled(_profiled_writer_cache, (value_type, compact, sort_keys), _compile_profiled, 'write', _compile_writer, value_type, compact, sort_keys)
+    return _compiled(_writer_cache, (value_type, compact, sort_keys), _compile_writer, value_type, compact, sort_keys)
+
+def _write_json_typed(output_stream, value, value_type, compact, sort_keys):
+    out = _JsonTextOutput(output_stream)
+    _compiled_writer(value_type, compact, sort_keys)(value, out, '' if compact else '\n')
+    out.append('\n')
+    out.flush()
+
+class _StdlibJsonBackend(object):
+    name = 'json'
+
+    def loads(self, data):
+        return json_loads(str(data, 'utf-8'))
+
+    def dumps(self, jsondata, compact, sort_keys):
+        return None # Written by _write_text()
+
+def _floats_match_stdlib(jsondata):
+    '''Return whether all floats in jsondata are finite and formatted without exponent by the stdlib.
+
+    Only then, orjson and rapidjson write floats exactly like the stdlib. In particular,
+    orjson writes NaN and infinite floats as null, and both write 1e16 instead of 1e+16.
+    '''
+    floats = []
+    def collect(value):
+        if type(value) is float:
+            floats.append(value)
+        elif isinstance(value, dict):
+            for item in value.values():
+                collect(item)
+        elif isinstance(value, list):
+            for item in value:
+                collect(item)
+    collect(jsondata)
+    return all(1e-4 <= abs(value) < 1e16 or value == 0.0 for value in floats)
+
+class _OrjsonBackend(object):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, data):
+        if _LONG_DIGITS_PATTERN.search(data):
+            raise ValueError('Integers beyond 64 bit would be parsed as floats')
+        return self._orjson.loads(data)
+
+    def dumps(self, jsondata, compact, sort_keys):
+        if not compact or sort_keys or not _floats_match_stdlib(jsondata):
+            return None # Indented output and sorted keys differ from the stdlib
+        try:
+            return self._orjson.dumps(jsondata, option=self._orjson.OPT_APPEND_NEWLINE)
+        except TypeError: # e.g. integers beyond 64 bit
+            return None
+
+class _RapidjsonBackend(object):
+    name = 'rapidjson'
+
+    def __init__(self):
+        import rapidjson
+        self._rapidjson = rapidjson
+
+    def loads(self, data):
+        return self._rapidjson.loads(str(data, 'utf-8'))
+
+    def dumps(self, jsondata, compact, sort_keys):
+        if not compact or sort_keys or not _floats_match_stdlib(jsondata):
+            return None # Indented output and sorted keys differ from the stdlib
+        try:
+            return (self._rapidjson.dumps(jsondata, ensure_ascii=False) + '\n').encode('utf-8')
+        except (TypeError, ValueError): # e.g. NaN
+            return None
+
+class _UjsonBackend(object):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def loads(self, data):
+        return self._ujson.loads(data if isinstance(data, bytes) else bytes(data))
+
+    def dumps(self, jsondata, compact, sort_keys):
+        return None # Float precision depends on the ujson version
+
+_JSON_BACKENDS = OrderedDict([
+    ('orjson', _OrjsonBackend),
+    ('rapidjson', _RapidjsonBackend),
+    ('ujson', _UjsonBackend),
+    ('json', _StdlibJsonBackend),
+])
+
+_STDLIB_JSON_BACKEND = _StdlibJsonBackend()
+
+_json_backend = None
+
+def set_backend(name=None):
+    '''Select the JSON library used for parsing and writing: 'orjson', 'rapidjson', 'ujson' or 'json' (stdlib).
+
+    By default, or with name=None, the first installed library of this list is used. Whenever the
+    selected library cannot produce exactly the same result as the stdlib, e.g. for integers beyond
+    64 bit, NaN, infinite or very large and small floats, or for pretty-printed or sorted output,
+    the stdlib is used instead.
+    '''
+    global _json_backend
+    if name is None:
+        _json_backend = None
+        return
+    if name not in _JSON_BACKENDS:
+        raise ValueError('Unknown JSON backend: {!r}'.format(name))
+    _json_backend = _STDLIB_JSON_BACKEND if name == 'json' else _JSON_BACKENDS[name]()
+
+def get_backend():
+    '''Return the name of the JSON library in use, see set_backend().'''
+    return _get_json_backend().name
+
+def _get_json_backend():
+    global _json_backend
+    if _json_backend is None:
+        for backend_class in _JSON_BACKENDS.values():
+            try:
+                _json_backend = _STDLIB_JSON_BACKEND if backend_class is _StdlibJsonBackend else backend_class()
+                break
+            except ImportError:
+                pass
+    return _json_backend
+
+def _json_loads(data):
+    backend = _get_json_backend()
+    if backend is not _STDLIB_JSON_BACKEND:
+        try:
+            return backend.loads(data)
+        except ValueError: # Let the stdlib decide, or report the error
+            pass
+    return _STDLIB_JSON_BACKEND.loads(data)
+
+def _write_json_data(output_stream, jsondata, compact, sort_keys):
+    jsonbytes = _get_json_backend().dumps(jsondata, compact, sort_keys)
+    if jsonbytes is None:
+        _write_text(output_stream, json_dumps(jsondata, **_json_format(compact, sort_keys)) + '\n')
+    else:
+        output_stream.write(jsonbytes)
+
+def _write_text(output_stream, text):
+    if len(text) <= _WRITE_CHUNK_SIZE:
+        output_stream.write(text.encode('utf-8'))
+        return
+    start = 0
+    while start < len(text):
+        end = start + _WRITE_CHUNK_SIZE
+        if '\ud800' <= text[end - 1:end] <= '\udbff': # Keep surrogate pairs of narrow Python 2 builds together
+            end += 1
+        output_stream.write(text[start:end].encode('utf-8'))
+        start = end
+
+def _json_format(compact, sort_keys):
+    if compact:
+        return dict(ensure_ascii=False, separators=(',', ':'), indent=None, sort_keys=sort_keys)
+    return dict(ensure_ascii=False, separators=(',', ': '), indent=2, sort_keys=sort_keys)
+
+def _write_json(output_stream, value, value_type, compact, sort_keys):
+    value = _materialize(value)
+    if _namedtuple_field_types(value_type) is not None and isinstance(value, value_type): # Faster than any backend
+        _write_json_typed(output_stream, value, value_type, compact, sort_keys)
+        return
+    jsondata = to_jsondata(value, value_type)
     _check_toplevel_jsondata(jsondata)
-    output_unicode_stream = getwriter('utf-8')(output_stream)
-    json_dump(obj=jsondata, fp=output_unicode_stream, ensure_ascii=False, separators=(',', ': '), indent=2, sort_keys=True)
-    output_unicode_stream.write('\n')
+    _write_json_data(output_stream, jsondata, compact, sort_keys)
+
+def _write_json_incremental(output_stream, value, value_type, compact, sort_keys):
+    '''Like _write_json(), but always use the writers of _compiled_writer().
 
-def write_json_gz(output_stream, value):
-    with _gzipfile(output_stream) as uncompressed_stream:
-        write_json(uncompressed_stream, value)
+    The output is written in blocks as it is generated, without any long-running call into
+    a C library, so other threads keep running while the value is serialized.
+    '''
+    value = _materialize(value)
+    if not isinstance(value, dict) and _namedtuple_field_types(type(value)) is None:
+        _raise_toplevel_error()
+    _write_json_typed(output_stream, value, value_type, compact, sort_keys)
 
-def serialize_json(value):
+def write_json(output_stream, value, value_type=None, compact=False, sort_keys=True):
+    '''Write value as JSON object, by default pretty-printed with sorted keys.
+
+    With compact=True, the JSON is written without indentation and with minimal separators.
+    With sort_keys=False, the keys are kept in field order.
+    '''
+    _write_json(_profiled_stream(output_stream, 'write'), value, value_type, compact, sort_keys)
+
+def write_json_gz(output_stream, value, value_type=None, gzip_options=None, compact=False, sort_keys=True):
+    with _gzipfile(_profiled_stream(output_stream, 'write'), gzip_options) as uncompressed_stream:
+        _write_json(_profiled_stream(uncompressed_stream, 'gzip'), value, value_type, compact, sort_keys)
+
+def serialize_json(value, value_type=None, compact=False, sort_keys=True):
     output_stream = BytesIO()
-    write_json(output_stream, value)
+    write_json(output_stream, value, value_type, compact, sort_keys)
     return output_stream.getvalue()
 
-def serialize_json_gz(value):
+def serialize_json_gz(value, value_type=None, gzip_options=None, compact=False, sort_keys=True):
     output_stream = BytesIO()
-    write_json_gz(output_stream, value)
+    write_json_gz(output_stream, value, value_type, gzip_options, compact, sort_keys)
     return output_stream.getvalue()
 
-def read_json(result_type, input_stream):
-    unicode_input_stream = getreader('utf-8')(input_stream)
-    jsondata = json_load(unicode_input_stream)
+def _json_text(jsondata, indent_level):
+    text = json_dumps(jsondata, **_json_format(compact=False, sort_keys=True))
+    return text.replace('\n', '\n' + '  ' * indent_level)
+
+class JsonStreamWriter(object):
+    '''Write a toplevel JSON object whose array field "path" is written item by item.
+
+    The head fields are written as they are, the items are converted according to item_type
+    (see compile_encoder). After close(), the output is identical to that of write_json().
+    '''
+
+    def __init__(self, output_stream, head_fields, item_type=None, path='records'):
+        head_jsondata = to_jsondata(head_fields)
+        _check_toplevel_jsondata(head_jsondata)
+        if path in head_jsondata:
+            raise ValueError('Unable to add array field {!r}, because it is already present: {!r}'.format(path, head_jsondata))
+        keys = sorted(list(head_jsondata) + [path])
+        self._output_stream = output_stream
+        self._head_jsondata = head_jsondata
+        self._keys_after = keys[keys.index(path) + 1:]
+        self._write_item = _compiled_writer(item_type, compact=False, sort_keys=True)
+        self._item_count = 0
+        self._closed = False
+        self._first_key = True
+        self._write('{')
+        for key in keys[:keys.index(path)]:
+            self._write_key(key)
+            self._write(_json_text(head_jsondata[key], 1))
+        self._write_key(path)
+
+    def _write(self, text):
+        self._output_stream.write(text.encode('utf-8'))
+
+    def _write_key(self, key):
+        self._write(('\n  ' if self._first_key else ',\n  ') + json_dumps(key, ensure_ascii=False) + ': ')
+        self._first_key = False
+
+    def write(self, item):
+        out = _JsonTextOutput(self._output_stream)
+        out.append('[\n    ' if self._item_count == 0 else ',\n    ')
+        self._write_item(item, out, '\n    ')
+        out.flush()
+        self._item_count += 1
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._write('[]' if self._item_count == 0 else '\n  ]')
+        for key in self._keys_after:
+            self._write_key(key)
+            self._write(_json_text(self._head_jsondata[key], 1))
+        self._write('\n}\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+def write_json_stream(output_stream, head_fields, items, item_type=None, path='records'):
+    with JsonStreamWriter(output_stream, head_fields, item_type, path) as writer:
+        for item in items:
+            writer.write(item)
+
+def write_json_stream_gz(output_stream, head_fields, items, item_type=None, path='records', gzip_options=None):
+    with _gzipfile(output_stream, gzip_options) as uncompressed_stream:
+        write_json_stream(uncompressed_stream, head_fields, items, item_type, path)
+
+class DecodeCache(object):
+    '''LRU cache of decoded values, keyed by result_type and a hash of the JSON bytes.
+
+    The cache holds values decoded from at most maxbytes of JSON input. The same instance is
+    returned on every hit, which is safe for NamedTuple trees unless they contain List or Dict
+    fields that are modified. For those, set copy_mutable to return deep copies instead.
+    '''
+
+    def __init__(self, maxbytes=67108864, copy_mutable=False):
+        self.maxbytes = maxbytes
+        self.copy_mutable = copy_mutable
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict() # key -> (value, size), least recently used first
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _get(self, key, size, decode):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            entry = (decode(), size)
+            if size > self.maxbytes:
+                return entry[0]
+            self.size += size
+            while self.size > self.maxbytes:
+                (_, (_, evicted_size)) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+        else:
+            self.hits += 1
+        self._entries[key] = entry
+        return deepcopy(entry[0]) if self.copy_mutable else entry[0]
+
+def _deserialize_json(result_type, data, lazy, intern=None, cache=None):
+    if cache is not None:
+        key = (result_type, bool(lazy), _intern_table(intern), sha256(data).digest())
+        return cache._get(key, len(data), lambda: _deserialize_json(result_type, data, lazy, intern))
+    jsondata = _json_loads(data)
     _check_toplevel_jsondata(jsondata)
-    return from_jsondata(result_type, jsondata)
+    if lazy:
+        if intern:
+            raise ValueError('Interning is not supported for lazy views')
+        return from_jsondata_lazy(result_type, jsondata)
+    return from_jsondata(result_type, jsondata, intern)
+
+def read_json(result_type, input_stream, lazy=False, intern=None, cache=None):
+    '''Read a JSON object as instance of result_type, or as lazy view if lazy is set (see from_jsondata_lazy).
+
+    For intern, see compile_decoder(). If cache is given, a DecodeCache, the result for
+    identical input is looked up there instead of decoding it again.
+    '''
+    return _deserialize_json(result_type, _profiled_stream(input_stream, 'read').read(), lazy, intern, cache)
+
+def validate_json(result_type, input_stream):
+    '''Check whether read_json() would accept the input, see validate_jsondata().'''
+    try:
+        jsondata = _json_loads(input_stream.read())
+        _check_toplevel_jsondata(jsondata)
+    except ValueError as e:
+        return [ValidationError(path='', message=str(e))]
+    return validate_jsondata(result_type, jsondata)
+
+def deserialize_json(result_type, data, cache=None):
+    '''Like read_json(), but decode the JSON bytes data.'''
+    return _deserialize_json(result_type, data, False, None, cache)
+
+class _Gunzipper(object):
+    '''Decompress concatenated gzip members, whose bytes are pushed via feed().'''
+
+    def __init__(self):
+        self._decompressor = None
+
+    def feed(self, data):
+        '''Process the next chunk of bytes, or b'' at the end of input.
+
+        Return a list of pairs of decompressed data and whether it completes a member.
+        '''
+        pieces = []
+        if not data:
+            if self._decompressor is not None:
+                if not getattr(self._decompressor, 'eof', True): # Python 2 cannot detect truncated data
+                    raise EOFError('Compressed file ended before the end-of-stream marker was reached')
+                pieces.append((self._decompressor.flush(), True))
+                self._decompressor = None
+            return pieces
+        while data:
+            if self._decompressor is None:
+                data = data.lstrip(b'\0') # Like GzipFile, ignore zero padding between members
+                if not data:
+                    break
+                self._decompressor = decompressobj(16 + MAX_WBITS)
+            try:
+                uncompressed_data = self._decompressor.decompress(data)
+            except zlib_error as e:
+                raise IOError('Invalid gzip data: {}'.format(e))
+            data = self._decompressor.unused_data
+            if data or getattr(self._decompressor, 'eof', False): # Python 2 only notices the end of a member via unused_data
+                pieces.append((uncompressed_data + self._decompressor.flush(), True))
+                self._decompressor = None
+            else:
+                pieces.append((uncompressed_data, False))
+        return pieces
+
+def _iter_gunzip(input_stream):
+    '''Decompress the concatenated gzip members of input_stream, reading large chunks.
+
+    Yield pairs of decompressed data and whether it completes a member.
+    '''
+    gunzipper = _Gunzipper()
+    while True:
+        data = input_stream.read(_GZIP_READ_CHUNK_SIZE)
+        for piece in gunzipper.feed(data):
+            yield piece
+        if not data:
+            break
+
+def read_json_gz(result_type, input_stream, intern=None):
+    '''Like read_json(), but decompress the input, which may consist of multiple concatenated gzip members.
+
+    The whole uncompressed document is kept in memory while parsing, as parsing it in one piece
+    is about three times faster than incremental parsing. Use iter_read_json() on a GzipFile to
+    keep the memory usage bounded by one item.
+    '''
+    start_time = default_timer()
+    data = b''.join([uncompressed_data for uncompressed_data, _ in _iter_gunzip(_profiled_stream(input_stream, 'read'))])
+    profiler = _profiler
+    if profiler is not None:
+        profiler.record_io('gunzip', len(data), default_timer() - start_time)
+    return _deserialize_json(result_type, data, False, intern)
+
+def iter_read_json_gz_members(result_type, input_stream):
+    '''Read concatenated gzip members, each containing a JSON object, yielding them as instances of result_type.'''
+    pieces = []
+    for uncompressed_data, member_end in _iter_gunzip(input_stream):
+        pieces.append(uncompressed_data)
+        if member_end:
+            yield _deserialize_json(result_type, b''.join(pieces), False)
+            pieces = []
+
+class _MappedFile(object):
+    '''Read-only memory mapping of a file, whose contents are available as buffer "data".'''
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as input_file:
+            # Empty files cannot be mapped
+            self._mapping = mmap(input_file.fileno(), 0, access=ACCESS_READ) if fstat(input_file.fileno()).st_size else None
+        if self._mapping is None:
+            self.data = b''
+        else:
+            try:
+                self.data = memoryview(self._mapping)
+            except TypeError: # Python 2 mmap only supports the old buffer interface
+                self.data = self._mapping
+
+    def close(self):
+        if self._mapping is not None:
+            if isinstance(self.data, memoryview):
+                self.data.release()
+            self._mapping.close()
+            self._mapping = None
+            self.data = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def _gunzip(data):
+    '''Decompress all members of gzip compressed data, which may be any buffer.'''
+    pieces = []
+    while True:
+        decompressor = decompressobj(16 + MAX_WBITS)
+        pieces.append(decompressor.decompress(data))
+        pieces.append(decompressor.flush())
+        if not getattr(decompressor, 'eof', True): # Python 2 cannot detect truncated data
+            raise EOFError('Compressed file ended before the end-of-stream marker was reached')
+        data = decompressor.unused_data
+        if not data.strip(b'\0'): # Like GzipFile, ignore trailing zero padding
+            return b''.join(pieces)
+
+def read_json_file(result_type, file_path, lazy=False):
+    '''Like read_json(), but parse the memory-mapped file directly instead of reading it into a bytes object.'''
+    with _MappedFile(file_path) as mapped_file:
+        return _deserialize_json(result_type, mapped_file.data, lazy)
+
+def read_json_gz_file(result_type, file_path, lazy=False):
+    '''Like read_json_gz(), but decompress the memory-mapped file in one go instead of reading it as stream.'''
+    with _MappedFile(file_path) as mapped_file:
+        data = _gunzip(mapped_file.data)
+    return _deserialize_json(result_type, data, lazy)
+
+class JsonFileIndex(object):
+    '''Offsets of the items of the array field "path" of a toplevel JSON object in an uncompressed file.
+
+    The file is memory-mapped and scanned once, so that single items can then be decoded by
+    position without parsing the rest of the file. Use as context manager, or call close().
+    '''
+
+    def __init__(self, file_path, path='records'):
+        self.path = path
+        self._mapped_file = _MappedFile(file_path)
+        try:
+            (self._starts, self._ends) = _index_json_field(self._mapped_file.data, path)
+        except:
+            self._mapped_file.close()
+            raise
+
+    def __len__(self):
+        return len(self._starts)
+
+    def read_jsondata(self, position):
+        '''Return the JSON data structure of the item at position.'''
+        return _json_loads(self._mapped_file.data[self._starts[position]:self._ends[position]])
+
+    def read(self, item_type, position):
+        '''Return the item at position as instance of item_type.'''
+        return compile_decoder(item_type)(self.read_jsondata(position))
+
+    def close(self):
+        self._mapped_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-def read_json_gz(result_type, input_stream):
+_NEED_MORE_DATA = object()
+
+class _JsonFieldScanner(object):
+    '''Incrementally parse a toplevel JSON object, returning the items of its array field "path".
+
+    Input bytes are pushed via feed(), so only the current item needs to be kept in memory.
+    All other fields of the toplevel object are parsed and discarded.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.found = False
+        from codecs import getincrementaldecoder # Only imported when needed, for a fast module import
+        self._text_decoder = getincrementaldecoder('utf-8')()
+        self._json_decoder = JSONDecoder()
+        self._text = ''
+        self._pos = 0
+        self._eof = False
+        self._retry_length = 0
+        self._key = None
+        self._state = self._parse_object_start
+
+    def feed(self, data):
+        '''Process the next chunk of bytes, or b'' at the end of input, and return the list of completed items.'''
+        self._eof = not data
+        self._text = self._text[self._pos:] + self._text_decoder.decode(data, final=self._eof)
+        self._pos = 0
+        items = []
+        while self._state is not None and self._state(items):
+            pass
+        if self._eof and self._state is not None:
+            raise ValueError('Unexpected end of JSON data')
+        return items
+
+    def _peek(self):
+        self._pos = _JSON_WHITESPACE.match(self._text, self._pos).end()
+        if self._pos == len(self._text):
+            return None
+        return self._text[self._pos]
+
+    def _expect(self, expected_chars):
+        char = self._peek()
+        if char is None:
+            return None
+        if char not in expected_chars:
+            raise ValueError('Expecting one of {!r} at position {} of JSON data, found {!r}'.format(expected_chars, self._pos, char))
+        self._pos += 1
+        return char
+
+    def _decode_value(self):
+        if self._peek() is None:
+            return _NEED_MORE_DATA
+        remaining_length = len(self._text) - self._pos
+        if not self._eof and remaining_length < self._retry_length:
+            return _NEED_MORE_DATA
+        try:
+            (value, end) = self._json_decoder.raw_decode(self._text, self._pos)
+        except ValueError:
+            if self._eof:
+                raise
+            self._retry_length = 2 * remaining_length # Avoid quadratic runtime for values spanning many chunks
+            return _NEED_MORE_DATA
+        if not self._eof and self._text[self._pos] in _JSON_NUMBER_START and (end == len(self._text) or self._text[end] in _JSON_NUMBER_CONTINUATION): # The number continues in the next chunk
+            self._retry_length = remaining_length + 1
+            return _NEED_MORE_DATA
+        self._retry_length = 0
+        self._pos = end
+        return value
+
+    def _parse_object_start(self, items):
+        char = self._peek()
+        if char is None:
+            return False
+        if char != '{':
+            _raise_toplevel_error()
+        self._pos += 1
+        self._state = self._parse_first_key
+        return True
+
+    def _parse_first_key(self, items):
+        char = self._peek()
+        if char is None:
+            return False
+        if char == '}':
+            self._pos += 1
+            self._state = self._parse_end
+        else:
+            self._state = self._parse_key
+        return True
+
+    def _parse_key(self, items):
+        if self._peek() not in (None, '"'):
+            raise ValueError('Expecting property name enclosed in double quotes at position {} of JSON data'.format(self._pos))
+        key = self._decode_value()
+        if key is _NEED_MORE_DATA:
+            return False
+        self._key = key
+        self._state = self._parse_colon
+        return True
+
+    def _parse_colon(self, items):
+        if self._expect(':') is None:
+            return False
+        self._state = self._parse_value
+        return True
+
+    def _parse_value(self, items):
+        if self._key == self.path:
+            if self.found:
+                raise ValueError('Duplicate array field {!r} in JSON object'.format(self.path))
+            char = self._peek()
+            if char is None:
+                return False
+            if char != '[':
+                raise ValueError('Expecting JSON array for field {!r}, found {!r}'.format(self.path, char))
+            self._pos += 1
+            self.found = True
+            self._state = self._parse_first_item
+            return True
+        if self._decode_value() is _NEED_MORE_DATA:
+            return False
+        self._state = self._parse_member_end
+        return True
+
+    def _parse_first_item(self, items):
+        char = self._peek()
+        if char is None:
+            return False
+        if char == ']':
+            self._pos += 1
+            self._state = self._parse_member_end
+        else:
+            self._state = self._parse_item
+        return True
+
+    def _parse_item(self, items):
+        item = self._decode_value()
+        if item is _NEED_MORE_DATA:
+            return False
+        items.append(item)
+        self._state = self._parse_item_end
+        return True
+
+    def _parse_item_end(self, items):
+        char = self._expect(',]')
+        if char is None:
+            return False
+        self._state = self._parse_item if char == ',' else self._parse_member_end
+        return True
+
+    def _parse_member_end(self, items):
+        char = self._expect(',}')
+        if char is None:
+            return False
+        self._state = self._parse_key if char == ',' else self._parse_end
+        return True
+
+    def _parse_end(self, items):
+        if self._peek() is not None:
+            raise ValueError('Extra data at position {} of JSON data'.format(self._pos))
+        if self._eof:
+            self._state = None
+        return False
+
+class _JsonObjectScanner(_JsonFieldScanner):
+    '''Incrementally parse a toplevel JSON object into "jsondata", like json.loads().
+
+    The items of array fields are parsed one by one as the data arrives, so the parsing work is
+    spread over the chunks pushed via feed(). The lists of items are available once complete.
+    '''
+
+    def __init__(self):
+        _JsonFieldScanner.__init__(self, None)
+        self.jsondata = {}
+        self._items = None
+
+    def _parse_value(self, items):
+        char = self._peek()
+        if char is None:
+            return False
+        if char == '[':
+            self._pos += 1
+            self._items = self.jsondata[self._key] = []
+            self._state = self._parse_first_item
+            return True
+        value = self._decode_value()
+        if value is _NEED_MORE_DATA:
+            return False
+        self.jsondata[self._key] = value
+        self._state = self._parse_member_end
+        return True
+
+    def _parse_item(self, items):
+        return _JsonFieldScanner._parse_item(self, self._items)
+
+class _JsonFieldIndexer(_JsonFieldScanner):
+    '''Find the start and end offsets of the items of the array field "path" of a toplevel JSON object.
+
+    The data is scanned as latin-1 text, whose character positions are the byte offsets, and each
+    item is skipped with JSONDecoder.raw_decode(). Items are only checked to be UTF-8 when decoded.
+    '''
+
+    def __init__(self, path):
+        _JsonFieldScanner.__init__(self, path)
+        self.starts = array(_INT64_TYPECODE)
+        self.ends = array(_INT64_TYPECODE)
+
+    def scan(self, data):
+        '''Process all of data, which may be any buffer.'''
+        self._text = str(data, 'latin-1')
+        self._eof = True
+        while self._state is not None and self._state(None):
+            pass
+        if self._state is not None:
+            raise ValueError('Unexpected end of JSON data')
+
+    def _parse_key(self, items):
+        self._peek()
+        start = self._pos
+        if not _JsonFieldScanner._parse_key(self, items):
+            return False
+        self._key = json_loads(self._text[start:self._pos].encode('latin-1').decode('utf-8')) # The key may contain non-ASCII characters
+        return True
+
+    def _parse_item(self, items):
+        self._peek()
+        start = self._pos
+        if self._decode_value() is _NEED_MORE_DATA:
+            return False
+        self.starts.append(start)
+        self.ends.append(self._pos)
+        self._state = self._parse_item_end
+        return True
+
+def _index_json_field(data, path):
+    '''Return arrays of start and end offsets of the items of the array field "path" of the toplevel JSON object in data.'''
+    indexer = _JsonFieldIndexer(path)
+    indexer.scan(data)
+    if not indexer.found:
+        raise ValueError('Unable to find array field {!r} in JSON object'.format(path))
+    return (indexer.starts, indexer.ends)
+
+def iter_read_json(item_type, input_stream, path='records'):
+    '''Incrementally read the array field "path" of a toplevel JSON object, yielding its items as instances of item_type.'''
+    decode_item = compile_decoder(item_type)
+    scanner = _JsonFieldScanner(path)
+    while True:
+        data = input_stream.read(_READ_CHUNK_SIZE)
+        for item_jsondata in scanner.feed(data):
+            yield decode_item(item_jsondata)
+        if not data:
+            break
+    if not scanner.found:
+        raise ValueError('Unable to find array field {!r} in JSON object'.format(path))
+
+def write_jsonl(output_stream, values, value_type=None):
+    '''Write values as JSON Lines, one compact JSON object per line.'''
+    encode = _to_jsondata_untyped if value_type is None else compile_encoder(value_type)
+    for value in values:
+        jsondata = encode(value)
+        _check_toplevel_jsondata(jsondata)
+        _write_json_data(output_stream, jsondata, compact=True, sort_keys=True)
+
+def write_jsonl_gz(output_stream, values, value_type=None, gzip_options=None):
+    with _gzipfile(output_stream, gzip_options) as uncompressed_stream:
+        write_jsonl(uncompressed_stream, values, value_type)
+
+def read_jsonl(result_type, input_stream):
+    '''Lazily read JSON Lines, yielding one instance of result_type per non-empty line.'''
+    decode = compile_decoder(result_type)
+    for line in input_stream:
+        if not line.strip():
+            continue
+        jsondata = _json_loads(line)
+        _check_toplevel_jsondata(jsondata)
+        yield decode(jsondata)
+
+def read_jsonl_gz(result_type, input_stream):
+    from gzip import GzipFile # Only imported when needed, for a fast module import
     with GzipFile(fileobj=input_stream, mode='rb') as uncompressed_stream:
-        return read_json(result_type, uncompressed_stream)
+        for value in read_jsonl(result_type, uncompressed_stream):
+            yield value
+
+def _decode_jsondata_chunk(result_type, jsondata_chunk):
+    decode = compile_decoder(result_type)
+    return [decode(jsondata) for jsondata in jsondata_chunk]
+
+def _decode_jsonl_chunk(result_type, lines):
+    return list(read_jsonl(result_type, lines))
+
+def _iter_chunks(items, chunksize):
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            break
+        yield chunk
+
+def _map_chunks_parallel(function, items, workers, chunksize):
+    '''Apply function to chunks of chunksize items and concatenate the results.
+
+    The chunks are pulled lazily from the iterable items, and at most two chunks per worker are
+    pending at any time, so the input is never held in memory as a whole.
+    '''
+    chunks = _iter_chunks(items, chunksize)
+    first_chunks = list(islice(chunks, 2))
+    process_pool_executor = _executor_class('ProcessPoolExecutor')
+    if process_pool_executor is None or workers == 1 or len(first_chunks) <= 1: # Pool overhead would dominate
+        return [result for chunk in chain(first_chunks, chunks) for result in function(chunk)]
+    from multiprocessing import cpu_count # Already imported by concurrent.futures
+    max_pending = 2 * (workers or cpu_count())
+    results = []
+    with process_pool_executor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chain(first_chunks, chunks):
+            pending.append(executor.submit(function, chunk))
+            while len(pending) > max_pending:
+                results.extend(pending.popleft().result())
+        while pending:
+            results.extend(pending.popleft().result())
+    return results
+
+def from_jsondata_parallel(result_type, jsondata_list, workers=None, chunksize=_PARALLEL_CHUNKSIZE):
+    '''Convert a list of JSON data structures to a list of result_type instances using multiple processes.
+
+    The work is split into chunks of chunksize items. Inputs that fit into a single chunk are
+    converted in the current process. The result_type must be picklable, e.g. defined at module level.
+    '''
+    return _map_chunks_parallel(partial(_decode_jsondata_chunk, result_type), jsondata_list, workers, chunksize)
+
+def read_jsonl_parallel(result_type, input_stream, workers=None, chunksize=_PARALLEL_CHUNKSIZE):
+    '''Like read_jsonl(), but parse and convert the lines using multiple processes, see from_jsondata_parallel().'''
+    return _map_chunks_parallel(partial(_decode_jsonl_chunk, result_type), input_stream, workers, chunksize)
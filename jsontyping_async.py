@@ -0,0 +1,140 @@
+__copyright__ = '''\
+Copyright (C) m-click.aero GmbH
+
+Permission to use, copy, modify, and/or distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+'''
+
+# asyncio support, requires Python 3.6 or later
+#
+# The data is transferred via asyncio.StreamReader and asyncio.StreamWriter, while parsing,
+# conversion and serialization run in an executor, by default the event loop's default
+# executor. Input is parsed incrementally, chunk by chunk, as it arrives, and output is
+# serialized chunk by chunk as it is written. This keeps the event loop responsive when
+# handling large payloads. As the parser state is kept between
+# chunks, the executor must run in the same process, e.g. a ThreadPoolExecutor.
+
+import asyncio
+from functools import partial
+from jsontyping import _Gunzipper, _JsonFieldScanner, _JsonObjectScanner, _READ_CHUNK_SIZE, _WRITE_CHUNK_SIZE, _decode_jsondata_chunk, _gzipfile, _write_json_incremental, from_jsondata
+from threading import Semaphore
+
+try:
+    _get_running_loop = asyncio.get_running_loop
+except AttributeError: # Python 3.6
+    _get_running_loop = asyncio.get_event_loop
+
+def _feed_gzip(gunzipper, scanner, data):
+    uncompressed_data = b''.join([piece for piece, _ in gunzipper.feed(data)])
+    if uncompressed_data:
+        scanner.feed(uncompressed_data)
+    if not data:
+        scanner.feed(b'')
+
+def _scan_items(scanner, item_type, data):
+    return _decode_jsondata_chunk(item_type, scanner.feed(data))
+
+async def _read_scanned(result_type, reader, executor, feed):
+    loop = _get_running_loop()
+    scanner = _JsonObjectScanner()
+    while True:
+        data = await reader.read(_READ_CHUNK_SIZE)
+        await loop.run_in_executor(executor, feed, scanner, data)
+        if not data:
+            break
+    return await loop.run_in_executor(executor, from_jsondata, result_type, scanner.jsondata)
+
+async def async_read_json(result_type, reader, executor=None):
+    '''Like read_json(), but read from an asyncio.StreamReader, parsing and converting the data in executor.'''
+    return await _read_scanned(result_type, reader, executor, _JsonObjectScanner.feed)
+
+async def async_read_json_gz(result_type, reader, executor=None):
+    return await _read_scanned(result_type, reader, executor, partial(_feed_gzip, _Gunzipper()))
+
+async def async_iter_read_json(item_type, reader, path='records', executor=None):
+    '''Like iter_read_json(), but read from an asyncio.StreamReader, parsing and converting each chunk in executor.'''
+    loop = _get_running_loop()
+    scanner = _JsonFieldScanner(path)
+    while True:
+        data = await reader.read(_READ_CHUNK_SIZE)
+        for item in await loop.run_in_executor(executor, _scan_items, scanner, item_type, data):
+            yield item
+        if not data:
+            break
+    if not scanner.found:
+        raise ValueError('Unable to find array field {!r} in JSON object'.format(path))
+
+class _ChunkChannel(object):
+    '''Hand the chunks written by a serializer running in the executor over to the event loop, one at a time.'''
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._written = Semaphore(0)
+        self._aborted = False
+
+    def write(self, data):
+        if data:
+            if not self._aborted:
+                self._loop.call_soon_threadsafe(self._queue.put_nowait, data)
+                self._written.acquire() # Until the event loop has written it, so only one chunk is kept in memory
+            if self._aborted:
+                raise IOError('Writing to the asyncio.StreamWriter failed')
+        return len(data)
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+
+    def abort(self):
+        self._aborted = True
+        self._written.release()
+
+    async def write_to(self, writer):
+        while True:
+            data = await self._queue.get()
+            if data is None:
+                return
+            for i in range(0, len(data), _WRITE_CHUNK_SIZE):
+                writer.write(data[i:i + _WRITE_CHUNK_SIZE])
+                await writer.drain()
+            self._written.release()
+
+def _serialize_to_channel(channel, write_chunks):
+    try:
+        write_chunks(channel)
+    finally:
+        channel.close()
+
+async def _write_serialized(writer, write_chunks, executor):
+    loop = _get_running_loop()
+    channel = _ChunkChannel(loop)
+    serialized = loop.run_in_executor(executor, _serialize_to_channel, channel, write_chunks)
+    try:
+        await channel.write_to(writer)
+    except BaseException:
+        channel.abort()
+        await asyncio.wait([serialized]) # The serializer stops at its next write, so it does not outlive the event loop
+        if not serialized.cancelled():
+            serialized.exception() # The error of the writer is reported instead
+        raise
+    await serialized
+
+def _write_json_gz_incremental(output_stream, value, value_type, gzip_options, compact, sort_keys):
+    with _gzipfile(output_stream, gzip_options) as uncompressed_stream:
+        _write_json_incremental(uncompressed_stream, value, value_type, compact, sort_keys)
+
+async def async_write_json(writer, value, value_type=None, compact=False, sort_keys=True, executor=None):
+    '''Like write_json(), but serialize value chunk by chunk in executor and write the chunks to an asyncio.StreamWriter.'''
+    await _write_serialized(writer, partial(_write_json_incremental, value=value, value_type=value_type, compact=compact, sort_keys=sort_keys), executor)
+
+async def async_write_json_gz(writer, value, value_type=None, gzip_options=None, compact=False, sort_keys=True, executor=None):
+    await _write_serialized(writer, partial(_write_json_gz_incremental, value=value, value_type=value_type, gzip_options=gzip_options, compact=compact, sort_keys=sort_keys), executor)
@@ -16,5 +16,5 @@ setup(
         'Topic :: Software Development :: Libraries',
     ],
     keywords='json',
-    py_modules=['jsontyping'],
+    py_modules=['jsontyping', 'jsontyping_async'],
 )
@@ -17,14 +17,39 @@ OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 '''
 
 from datetime import date, datetime, timedelta
+from gzip import GzipFile
 from io import BytesIO
-from jsontyping import from_jsondata, read_json, read_json_gz, serialize_json, serialize_json_gz, to_jsondata, write_json, write_json_gz
-from pytest import raises
-from typing import Dict, List, NamedTuple, Union
+from array import array
+from gc import collect
+from jsontyping import ColumnarList, DecodeCache, GzipOptions, InternTable, InternedStr, JsonFileIndex, Profiler, ValidationError, compile_decoder, compile_encoder, deserialize_json, from_jsondata, from_jsondata_columnar, from_jsondata_lazy, from_jsondata_parallel, iter_read_json, iter_read_json_gz_members, read_json, read_json_file, read_json_gz, read_json_gz_file, read_jsonl, read_jsonl_gz, read_jsonl_parallel, serialize_json, serialize_json_gz, set_backend, set_profiler, get_backend, to_jsondata, validate_json, validate_jsondata, write_json, write_json_gz, write_json_stream, write_json_stream_gz, write_jsonl, write_jsonl_gz
+from os.path import abspath, dirname
+from pytest import mark, raises
+from subprocess import check_output
+from sys import executable, version_info
+from textwrap import dedent
+from typing import Dict, List, NamedTuple, Optional, Union
+from weakref import ref
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 if str is bytes:
     str = unicode # Compatibility with Python 2
 
+# Defined at module level, so it can be pickled for worker processes
+ParallelNamedTuple = NamedTuple('ParallelNamedTuple', [
+    ('a', int),
+    ('b', datetime),
+])
+
+# Defined at module level, so the forward reference can be resolved
+RecursiveNamedTuple = NamedTuple('RecursiveNamedTuple', [
+    ('name', str),
+    ('children', List['RecursiveNamedTuple']),
+])
+
 def test_jsondata_roundtrip():
     NamedTupleEmpty = NamedTuple('NamedTupleEmpty', [
     ])
@@ -468,3 +493,826 @@ def test_nonobject_read_json_gz():
         # b'[1, 2, 3]'
         read_json_gz(List[int], BytesIO(b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\xff\x8b6\xd4Q0\xd2Q0\x8e\x05\x00\xc1;!\xb8\t\x00\x00\x00'))
     assert str(excinfo.value) == 'For security reasons, refusing to handle JSON data whose toplevel is not a JSON object'
+
+def test_compile_decoder():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('b', List[datetime]),
+    ])
+    decoder = compile_decoder(List[NamedTupleA])
+    assert decoder is compile_decoder(List[NamedTupleA])
+    assert decoder([{'a': 1, 'b': ['2016-07-01T18:00:28Z']}, None]) == [NamedTupleA(a=1, b=[datetime(2016, 7, 1, 18, 0, 28)]), None]
+    with raises(ValueError) as excinfo:
+        decoder([{'a': 1}])
+    assert str(excinfo.value).startswith('Unable to generate instance of ')
+
+def test_compile_decoder_unsupported_type():
+    decoder = compile_decoder(object)
+    assert decoder(None) is None
+    with raises(ValueError) as excinfo:
+        decoder({})
+    assert str(excinfo.value).startswith('Unable to generate instance of ')
+
+def test_compile_encoder():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('b', List[datetime]),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('c', date),
+    ])
+    encoder = compile_encoder(List[Union[NamedTupleA, NamedTupleB]])
+    assert encoder is compile_encoder(List[Union[NamedTupleA, NamedTupleB]])
+    value = [NamedTupleA(a=1, b=[datetime(2016, 7, 1, 18, 0, 28)]), NamedTupleB(c=date(2017, 1, 2))]
+    jsondata = [
+        {'a': 1, 'b': ['2016-07-01T18:00:28Z'], 'type': 'NamedTupleA'},
+        {'c': '2017-01-02', 'type': 'NamedTupleB'},
+    ]
+    assert encoder(value) == jsondata
+    assert to_jsondata(value, List[Union[NamedTupleA, NamedTupleB]]) == jsondata
+
+def test_write_json_value_type():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('b', List[Union[NamedTupleA]]),
+        ('c', datetime),
+    ])
+    value = NamedTupleB(b=[NamedTupleA(a=1)], c=datetime(2016, 7, 1, 18, 0, 28, 123456))
+    assert serialize_json(value, NamedTupleB) == serialize_json(value)
+    assert serialize_json_gz(value, NamedTupleB) == serialize_json_gz(value)
+
+def test_from_jsondata_union_variants():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('a', int),
+        ('b', List[str]),
+    ])
+    jsondata = [
+        {'type': 'NamedTupleB', 'a': 1, 'b': ['x']},
+        {'type': 'NamedTupleA', 'a': 2},
+        None,
+    ]
+    assert from_jsondata(List[Union[NamedTupleA, NamedTupleB]], jsondata) == [NamedTupleB(a=1, b=['x']), NamedTupleA(a=2), None]
+    assert jsondata[0] == {'type': 'NamedTupleB', 'a': 1, 'b': ['x']}
+    with raises(ValueError) as excinfo:
+        from_jsondata(Union[NamedTupleA, NamedTupleB], {'type': 'NamedTupleA', 'a': 2, 'b': 3})
+    assert str(excinfo.value) == 'Unable to generate instance of {!r} from JSON data structure: {!r}'.format(NamedTupleA, {'a': 2, 'b': 3})
+    with raises(ValueError) as excinfo:
+        from_jsondata(Union[NamedTupleA, NamedTupleB], {'type': ['NamedTupleA']})
+    assert str(excinfo.value).startswith('Unable to find type ')
+
+def test_datetime_formats():
+    for value in [datetime(2016, 7, 1, 18, 0, 28, 123456), datetime(2017, 3, 6, 15, 1, 31, 0), datetime(2016, 7, 1, 18, 0, 28, 1)]:
+        jsondata = to_jsondata(value)
+        assert jsondata == value.strftime('%Y-%m-%dT%H:%M:%S.%fZ' if value.microsecond else '%Y-%m-%dT%H:%M:%SZ')
+        assert from_jsondata(datetime, jsondata) == value
+    assert from_jsondata(datetime, '2016-07-01T18:00:28.1Z') == datetime(2016, 7, 1, 18, 0, 28, 100000)
+    assert to_jsondata(date(2017, 1, 2)) == '2017-01-02'
+    assert from_jsondata(date, '2017-01-02') == date(2017, 1, 2)
+    for (result_type, jsondata, date_format) in [
+        (datetime, '2016-13-01T18:00:28.123456Z', '%Y-%m-%dT%H:%M:%S.%fZ'),
+        (datetime, '2016-07-01T18:00:28+01:00Z', '%Y-%m-%dT%H:%M:%SZ'),
+        (datetime, '2016-07-01 18:00:28Z', '%Y-%m-%dT%H:%M:%SZ'),
+        (date, '2016-02-30', '%Y-%m-%d'),
+    ]:
+        with raises(ValueError) as expected_excinfo:
+            datetime.strptime(jsondata, date_format)
+        with raises(ValueError) as excinfo:
+            from_jsondata(result_type, jsondata)
+        assert str(excinfo.value) == str(expected_excinfo.value)
+
+def test_datetime_parsing_matches_strptime():
+    datetimes = ['2016-07-01T18:00:28.123456Z', '2016-02-29T00:00:00.000001Z', '0999-12-31T23:59:59.999999Z', '2017-01-02T03:04:05Z', '2016-07-01T18:00:60Z']
+    for jsondata in datetimes:
+        date_format = '%Y-%m-%dT%H:%M:%S.%fZ' if '.' in jsondata else '%Y-%m-%dT%H:%M:%SZ'
+        try:
+            expected_value = datetime.strptime(jsondata, date_format)
+        except ValueError as e:
+            with raises(ValueError) as excinfo:
+                from_jsondata(datetime, jsondata)
+            assert str(excinfo.value) == str(e)
+        else:
+            assert from_jsondata(datetime, jsondata) == expected_value
+    for jsondata in ['2016-02-29', '0001-01-01', '9999-12-31', '2017-02-29']:
+        try:
+            expected_value = datetime.strptime(jsondata, '%Y-%m-%d').date()
+        except ValueError as e:
+            with raises(ValueError) as excinfo:
+                from_jsondata(date, jsondata)
+            assert str(excinfo.value) == str(e)
+        else:
+            assert from_jsondata(date, jsondata) == expected_value
+
+class OneByteStream(object):
+    def __init__(self, data):
+        self.input_stream = BytesIO(data)
+    def read(self, size=-1):
+        return self.input_stream.read(1)
+
+class ChunkedStream(object):
+    def __init__(self, data, chunk_size):
+        self.input_stream = BytesIO(data)
+        self.chunk_size = chunk_size
+    def read(self, size=-1):
+        return self.input_stream.read(self.chunk_size)
+
+def test_iter_read_json_chunk_boundaries():
+    jsonbytes = b'{"head": -1.5e-3, "records": [12.5, 2e3, -4.25, 0.0, -0.0, 1E+2, 30.0, 7.125e-2], "tail": 1.5}'
+    for chunk_size in range(1, len(jsonbytes) + 1):
+        assert list(iter_read_json(float, ChunkedStream(jsonbytes, chunk_size))) == [12.5, 2e3, -4.25, 0.0, -0.0, 1e2, 30.0, 7.125e-2]
+
+def test_iter_read_json():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('b', str),
+        ('c', datetime),
+    ])
+    jsonbytes = (
+        b'{\n'
+        b'  "head": {"x": [1, 2, {"records": []}]},\n'
+        b'  "records": [\n'
+        b'    {"a": 123456789012345678901234567890, "b": "x\xc2\xa7", "c": "2016-07-01T18:00:28.123456Z"},\n'
+        b'    null,\n'
+        b'    {"a": 2, "b": "[]{}", "c": null}\n'
+        b'  ],\n'
+        b'  "tail": 1.5\n'
+        b'}\n'
+    )
+    values = [
+        NamedTupleA(a=123456789012345678901234567890, b='x\u00a7', c=datetime(2016, 7, 1, 18, 0, 28, 123456)),
+        None,
+        NamedTupleA(a=2, b='[]{}', c=None),
+    ]
+    assert list(iter_read_json(NamedTupleA, BytesIO(jsonbytes))) == values
+    assert list(iter_read_json(NamedTupleA, OneByteStream(jsonbytes))) == values
+    assert list(iter_read_json(int, BytesIO(b'{"items": [1, 23, 456]}'), path='items')) == [1, 23, 456]
+    assert list(iter_read_json(int, OneByteStream(b'{"items": [1, 23, 456]}'), path='items')) == [1, 23, 456]
+    assert list(iter_read_json(int, BytesIO(b'{"records": []}'))) == []
+
+def test_iter_read_json_errors():
+    with raises(ValueError) as excinfo:
+        list(iter_read_json(int, BytesIO(b'[1, 2, 3]')))
+    assert str(excinfo.value) == 'For security reasons, refusing to handle JSON data whose toplevel is not a JSON object'
+    with raises(ValueError) as excinfo:
+        list(iter_read_json(int, BytesIO(b'{"other": [1, 2, 3]}')))
+    assert str(excinfo.value).startswith('Unable to find array field ')
+    with raises(ValueError) as excinfo:
+        list(iter_read_json(int, BytesIO(b'{"records": [1, 2')))
+    assert str(excinfo.value) == 'Unexpected end of JSON data'
+    with raises(ValueError) as excinfo:
+        list(iter_read_json(int, BytesIO(b'{"records": [1, 2]} x')))
+    assert str(excinfo.value).startswith('Extra data ')
+
+def test_write_json_stream():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('b', Dict[str, date]),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('c', str),
+    ])
+    NamedTupleC = NamedTuple('NamedTupleC', [
+        ('head', str),
+        ('records', List[Union[NamedTupleA, NamedTupleB]]),
+        ('tail', List[int]),
+        ('x', datetime),
+    ])
+    records = [
+        NamedTupleA(a=1, b={'y': date(2017, 1, 2), 'x': date(2017, 1, 3)}),
+        NamedTupleB(c='x\u00a7'),
+    ]
+    head_fields = {'tail': [1, 2], 'head': 'test', 'x': datetime(2016, 7, 1, 18, 0, 28, 123456)}
+    for items in [records, []]:
+        value = NamedTupleC(records=items, **head_fields)
+        output_stream = BytesIO()
+        write_json_stream(output_stream, head_fields, (item for item in items), Union[NamedTupleA, NamedTupleB])
+        assert output_stream.getvalue() == serialize_json(value)
+        output_stream_gz = BytesIO()
+        write_json_stream_gz(output_stream_gz, head_fields, iter(items), Union[NamedTupleA, NamedTupleB])
+        assert output_stream_gz.getvalue() == serialize_json_gz(value)
+    output_stream = BytesIO()
+    write_json_stream(output_stream, {}, iter([1, 2]), path='a')
+    assert output_stream.getvalue() == serialize_json({'a': [1, 2]})
+
+def test_write_json_stream_errors():
+    with raises(ValueError) as excinfo:
+        write_json_stream(BytesIO(), [1, 2, 3], [])
+    assert str(excinfo.value) == 'For security reasons, refusing to handle JSON data whose toplevel is not a JSON object'
+    with raises(ValueError) as excinfo:
+        write_json_stream(BytesIO(), {'records': 1}, [])
+    assert str(excinfo.value).startswith('Unable to add array field ')
+
+def test_jsonl_roundtrip():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('b', str),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('c', datetime),
+    ])
+    values = [
+        NamedTupleA(a=1, b='x\u00a7\n'),
+        NamedTupleB(c=datetime(2016, 7, 1, 18, 0, 28, 123456)),
+    ]
+    jsonbytes = (
+        b'{"a":1,"b":"x\xc2\xa7\\n","type":"NamedTupleA"}\n'
+        b'{"c":"2016-07-01T18:00:28.123456Z","type":"NamedTupleB"}\n'
+    )
+    output_stream = BytesIO()
+    write_jsonl(output_stream, iter(values), Union[NamedTupleA, NamedTupleB])
+    assert output_stream.getvalue() == jsonbytes
+    write_jsonl(output_stream, values[:1], Union[NamedTupleA, NamedTupleB])
+    output_stream.write(b'\n')
+    assert list(read_jsonl(Union[NamedTupleA, NamedTupleB], BytesIO(output_stream.getvalue()))) == values + values[:1]
+    output_stream_gz = BytesIO()
+    write_jsonl_gz(output_stream_gz, values, Union[NamedTupleA, NamedTupleB])
+    write_jsonl_gz(output_stream_gz, values[:1], Union[NamedTupleA, NamedTupleB])
+    assert list(read_jsonl_gz(Union[NamedTupleA, NamedTupleB], BytesIO(output_stream_gz.getvalue()))) == values + values[:1]
+
+def test_nonobject_jsonl():
+    with raises(ValueError) as excinfo:
+        write_jsonl(BytesIO(), [[1, 2, 3]])
+    assert str(excinfo.value) == 'For security reasons, refusing to handle JSON data whose toplevel is not a JSON object'
+    with raises(ValueError) as excinfo:
+        list(read_jsonl(Dict[str, int], BytesIO(b'{"a":1}\n[1,2,3]\n')))
+    assert str(excinfo.value) == 'For security reasons, refusing to handle JSON data whose toplevel is not a JSON object'
+
+def test_from_jsondata_parallel():
+    jsondata_list = [{'a': i, 'b': '2016-07-01T18:00:28Z'} for i in range(5)] + [None]
+    values = [ParallelNamedTuple(a=i, b=datetime(2016, 7, 1, 18, 0, 28)) for i in range(5)] + [None]
+    assert from_jsondata_parallel(ParallelNamedTuple, jsondata_list) == values
+    assert from_jsondata_parallel(ParallelNamedTuple, jsondata_list, workers=2, chunksize=2) == values
+    assert from_jsondata_parallel(ParallelNamedTuple, []) == []
+    with raises(ValueError) as excinfo:
+        from_jsondata_parallel(ParallelNamedTuple, jsondata_list + [{'a': 1}], workers=2, chunksize=2)
+    assert str(excinfo.value).startswith('Unable to generate instance of ')
+
+def test_read_jsonl_parallel():
+    values = [ParallelNamedTuple(a=i, b=datetime(2016, 7, 1, 18, 0, 28)) for i in range(5)]
+    output_stream = BytesIO()
+    write_jsonl(output_stream, values)
+    assert read_jsonl_parallel(ParallelNamedTuple, BytesIO(output_stream.getvalue())) == values
+    assert read_jsonl_parallel(ParallelNamedTuple, BytesIO(output_stream.getvalue()), workers=2, chunksize=2) == values
+    lines = BytesIO(output_stream.getvalue() * 10)
+    assert read_jsonl_parallel(ParallelNamedTuple, (line for line in lines), workers=2, chunksize=3) == values * 10
+
+def test_gzip_options():
+    value = {
+        'a': ['x' * 100, 'y' * 100],
+        'b': datetime(2016, 7, 1, 18, 0, 28, 123456),
+    }
+    jsonbytes = serialize_json(value)
+    assert serialize_json_gz(value, gzip_options=GzipOptions()) == serialize_json_gz(value)
+    sizes = []
+    for gzip_options in [GzipOptions(compresslevel=1), GzipOptions(compresslevel=6, strategy=1, buffer_size=1), GzipOptions(compresslevel=9)]:
+        jsonbytes_gz = serialize_json_gz(value, gzip_options=gzip_options)
+        assert GzipFile(fileobj=BytesIO(jsonbytes_gz), mode='rb').read() == jsonbytes
+        assert read_json_gz(Dict[str, List[str]], BytesIO(serialize_json_gz({'a': ['x']}, gzip_options=gzip_options))) == {'a': ['x']}
+        sizes.append(len(jsonbytes_gz))
+    assert sizes[0] >= sizes[2]
+    output_stream_gz = BytesIO()
+    write_jsonl_gz(output_stream_gz, [{'a': 1}], gzip_options=GzipOptions(compresslevel=1))
+    assert list(read_jsonl_gz(Dict[str, int], BytesIO(output_stream_gz.getvalue()))) == [{'a': 1}]
+
+def test_serialize_json_compact():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('b', List[int]),
+        ('a', str),
+    ])
+    value = NamedTupleA(b=[1, 2], a='x\u00a7')
+    assert serialize_json(value, compact=True) == b'{"a":"x\xc2\xa7","b":[1,2]}\n'
+    assert serialize_json(value, compact=True, sort_keys=False) == b'{"b":[1,2],"a":"x\xc2\xa7"}\n'
+    assert serialize_json(value, sort_keys=False) == b'{\n  "b": [\n    1,\n    2\n  ],\n  "a": "x\xc2\xa7"\n}\n'
+    output_stream = BytesIO()
+    write_json(output_stream, value, NamedTupleA, compact=True)
+    assert output_stream.getvalue() == b'{"a":"x\xc2\xa7","b":[1,2]}\n'
+    jsonbytes_gz = serialize_json_gz(value, compact=True)
+    assert GzipFile(fileobj=BytesIO(jsonbytes_gz), mode='rb').read() == b'{"a":"x\xc2\xa7","b":[1,2]}\n'
+    assert read_json_gz(NamedTupleA, BytesIO(jsonbytes_gz)) == value
+
+def test_read_write_json_large():
+    value = {
+        'a': ['x\u00a7\U0001f600' * 100000, 'y' * 1048576],
+    }
+    jsonbytes = b'{\n  "a": [\n    "' + b'x\xc2\xa7\xf0\x9f\x98\x80' * 100000 + b'",\n    "' + b'y' * 1048576 + b'"\n  ]\n}\n'
+    assert serialize_json(value) == jsonbytes
+    assert read_json(Dict[str, List[str]], BytesIO(jsonbytes)) == value
+
+def test_set_backend():
+    try:
+        set_backend('json')
+        assert get_backend() == 'json'
+        with raises(ValueError) as excinfo:
+            set_backend('nonexisting')
+        assert str(excinfo.value).startswith('Unknown JSON backend: ')
+    finally:
+        set_backend(None)
+
+def serialize_jsonl(values, value_type):
+    output_stream = BytesIO()
+    write_jsonl(output_stream, values, value_type)
+    return output_stream.getvalue()
+
+@mark.skipif(orjson is None, reason='orjson is not installed')
+def test_orjson_backend():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('b', float),
+        ('c', str),
+    ])
+    try:
+        set_backend('orjson')
+        assert get_backend() == 'orjson'
+        for value in [NamedTupleA(a=1, b=1.5, c='x\u00a7'), NamedTupleA(a=123456789012345678901234567890, b=None, c='')]:
+            jsonbytes = serialize_json(value)
+            jsonbytes_compact = serialize_json(value, compact=True)
+            assert read_json(NamedTupleA, BytesIO(jsonbytes)) == value
+            assert read_json(NamedTupleA, BytesIO(jsonbytes_compact)) == value
+            set_backend('json')
+            assert serialize_json(value) == jsonbytes
+            assert serialize_json(value, compact=True) == jsonbytes_compact
+            set_backend('orjson')
+        with raises(ValueError) as excinfo:
+            read_json(NamedTupleA, BytesIO(b'[1, 2, 3]'))
+        assert str(excinfo.value) == 'For security reasons, refusing to handle JSON data whose toplevel is not a JSON object'
+        values = [NamedTupleA(a=1, b=b, c='') for b in [float('nan'), float('inf'), -float('inf'), 1e16, 1e-7, 123.25]]
+        jsonlines = serialize_jsonl(values, NamedTupleA)
+        jsonbytes_compact = [serialize_json(value, compact=True) for value in values]
+        set_backend('json')
+        assert serialize_jsonl(values, NamedTupleA) == jsonlines
+        assert [serialize_json(value, compact=True) for value in values] == jsonbytes_compact
+        assert jsonbytes_compact[3] == b'{"a":1,"b":1e+16,"c":""}\n'
+        set_backend('orjson')
+        for value, result in zip(values, read_jsonl(NamedTupleA, BytesIO(jsonlines))):
+            assert repr(result) == repr(value) # NaN != NaN
+    finally:
+        set_backend(None)
+
+def test_serialize_json_typed_matches_untyped():
+    NamedTupleEmpty = NamedTuple('NamedTupleEmpty', [
+    ])
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('b', str),
+        ('a', int),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('z', List[float]),
+        ('type2', Dict[str, NamedTupleA]),
+    ])
+    class NamedTupleASubClass(NamedTupleA):
+        pass
+    NamedTupleC = NamedTuple('NamedTupleC', [
+        ('u', List[Union[NamedTupleA, NamedTupleB, NamedTupleEmpty]]),
+        ('e', NamedTupleEmpty),
+        ('d', datetime),
+        ('c', date),
+        ('t', timedelta),
+        ('l', List[List[bool]]),
+        ('n', NamedTupleA),
+        ('x', Dict[str, List[date]]),
+        ('y', int),
+    ])
+    value = NamedTupleC(
+        u=[
+            NamedTupleA(b='x\u00a7"\n\\', a=123456789012345678901234567890),
+            NamedTupleB(z=[1.5, float('nan'), float('inf'), -float('inf'), 1e16], type2={'k': NamedTupleA(b='', a=-1)}),
+            NamedTupleASubClass(b='sub', a=2),
+            NamedTupleEmpty(),
+        ],
+        e=NamedTupleEmpty(),
+        d=datetime(2016, 7, 1, 18, 0, 28, 123456),
+        c=date(2017, 1, 2),
+        t=timedelta(minutes=10, microseconds=3),
+        l=[[True, False], []],
+        n=NamedTupleASubClass(b='sub', a=3),
+        x={'b': [date(2016, 1, 2)], 'a': []},
+        y=None,
+    )
+    for backend in ['json'] + (['orjson'] if orjson is not None else []):
+        try:
+            set_backend(backend)
+            for compact in [False, True]:
+                for sort_keys in [True, False]:
+                    with Profiler() as profiler:
+                        jsonbytes = serialize_json(value, NamedTupleC, compact, sort_keys)
+                    assert ('write', NamedTupleC, None) in profiler.call_stats # Written directly, without JSON data structure
+                    assert ('encode', NamedTupleC, None) not in profiler.call_stats
+                    assert jsonbytes == serialize_json(value, None, compact, sort_keys)
+        finally:
+            set_backend(None)
+    NamedTupleD = NamedTuple('NamedTupleD', [
+        ('a', int),
+        ('u', List[Union[NamedTupleA, NamedTupleB, NamedTupleEmpty]]),
+    ])
+    output_stream = BytesIO()
+    write_json_stream(output_stream, {'a': 1}, value.u, Union[NamedTupleA, NamedTupleB, NamedTupleEmpty], path='u')
+    assert output_stream.getvalue() == serialize_json(NamedTupleD(a=1, u=value.u))
+
+def test_from_jsondata_lazy():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('d', date),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('a', int),
+    ])
+    NamedTupleC = NamedTuple('NamedTupleC', [
+        ('x', List[NamedTupleA]),
+        ('u', Union[NamedTupleA, NamedTupleB]),
+        ('n', NamedTupleB),
+    ])
+    jsondata = {
+        'x': [{'a': 1, 'd': '2017-01-02'}, {'a': 2, 'd': None}],
+        'u': {'type': 'NamedTupleB', 'a': 3},
+        'n': None,
+    }
+    value = from_jsondata(NamedTupleC, jsondata)
+    lazy_value = from_jsondata_lazy(NamedTupleC, jsondata)
+    assert lazy_value.x[0].d == date(2017, 1, 2)
+    assert lazy_value[1].a == 3
+    assert lazy_value.n is None
+    assert len(lazy_value.x) == 2
+    assert lazy_value == value
+    assert lazy_value._asdict()['u'] == NamedTupleB(a=3)
+    assert lazy_value._materialize() == value
+    assert type(lazy_value._materialize().u) is NamedTupleB
+    assert serialize_json(lazy_value) == serialize_json(value)
+    assert serialize_json(lazy_value, NamedTupleC) == serialize_json(value)
+    assert read_json(NamedTupleC, BytesIO(serialize_json(value)), lazy=True) == value
+
+def test_from_jsondata_lazy_validate():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('x', List[NamedTupleA]),
+    ])
+    jsondata = {'x': [{'a': 1}, {'a': 'b'}]}
+    with raises(ValueError) as excinfo:
+        from_jsondata_lazy(NamedTupleB, jsondata)
+    assert str(excinfo.value) == 'Unable to generate instance of {!r} from JSON data structure: {!r}'.format(int, 'b')
+    lazy_value = from_jsondata_lazy(NamedTupleB, jsondata, validate='deferred')
+    assert lazy_value.x[0].a == 1
+    with raises(ValueError):
+        lazy_value.x[1].a
+    with raises(ValueError) as excinfo:
+        from_jsondata_lazy(NamedTupleB, jsondata, validate='never')
+    assert str(excinfo.value).startswith('Invalid validation mode: ')
+
+def test_read_json_file(tmpdir):
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('b', str),
+    ])
+    value = NamedTupleA(a=123456789012345678901234567890, b='x\u00a7')
+    json_path = str(tmpdir.join('a.json'))
+    with open(json_path, 'wb') as output_stream:
+        write_json(output_stream, value)
+    assert read_json_file(NamedTupleA, json_path) == value
+    assert read_json_file(NamedTupleA, json_path, lazy=True) == value
+    json_gz_path = str(tmpdir.join('a.json.gz'))
+    with open(json_gz_path, 'wb') as output_stream:
+        output_stream.write(serialize_json_gz(value) + serialize_json_gz(value) + b'\0' * 8)
+    with raises(ValueError):
+        read_json_gz_file(NamedTupleA, json_gz_path) # Two concatenated JSON objects
+    with open(json_gz_path, 'wb') as output_stream:
+        write_json_gz(output_stream, value)
+    assert read_json_gz_file(NamedTupleA, json_gz_path) == value
+    empty_path = str(tmpdir.join('empty.json'))
+    open(empty_path, 'wb').close()
+    with raises(ValueError):
+        read_json_file(NamedTupleA, empty_path)
+
+def test_json_file_index(tmpdir):
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('b', List[str]),
+    ])
+    json_path = str(tmpdir.join('a.json'))
+    items = [NamedTupleA(a=i, b=['x\u00a7,]}', '"\\[']) for i in range(5)]
+    with open(json_path, 'wb') as output_stream:
+        write_json_stream(output_stream, {'a': '"records": [', 'z': [[1], {'records': 2}]}, items, NamedTupleA)
+    with JsonFileIndex(json_path) as index:
+        assert len(index) == 5
+        assert index.read(NamedTupleA, 3) == items[3]
+        assert index.read(NamedTupleA, -1) == items[-1]
+        assert index.read_jsondata(0) == {'a': 0, 'b': ['x\u00a7,]}', '"\\[']}
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('records', List[NamedTupleA]),
+    ])
+    value = NamedTupleB(items + [NamedTupleA(a=-1, b=['\u4e2d' * 3, '\\u'])])
+    for compact in [False, True]:
+        with open(json_path, 'wb') as output_stream:
+            write_json(output_stream, value, NamedTupleB, compact=compact)
+        with open(json_path, 'rb') as input_stream:
+            data = input_stream.read()
+        with open(json_path, 'rb') as input_stream:
+            expected = read_json(NamedTupleB, input_stream)
+        with JsonFileIndex(json_path) as index:
+            assert [index.read(NamedTupleA, position) for position in range(len(index))] == expected.records
+            for (start, end, item) in zip(index._starts, index._ends, expected.records):
+                assert read_json(NamedTupleA, BytesIO(data[start:end])) == item
+                assert data[start:start + 1] == b'{' and data[end - 1:end] == b'}'
+    for text in [b'{"\\u00e9": [], "x\\u00e9": [1, "\xc3\xa9"]}', '{"\u00e9": [], "x\u00e9": [1, "\u00e9"]}'.encode('utf-8')]:
+        with open(json_path, 'wb') as output_stream:
+            output_stream.write(text)
+        with JsonFileIndex(json_path, 'x\u00e9') as index:
+            assert [index.read_jsondata(position) for position in range(len(index))] == [1, '\u00e9']
+    for (text, message) in [
+        (b'{"records": [1, 2] , "x": {}}', None),
+        (b' {"records" : [ ] }\n', None),
+        (b'[]', 'For security reasons, refusing to handle JSON data whose toplevel is not a JSON object'),
+        (b'{"x": []}', 'Unable to find array field '),
+        (b'{"records": {}}', 'Expecting JSON array for field '),
+        (b'{"records": [], "records": []}', 'Duplicate array field '),
+        (b'{"records": [1, 2]', 'Unexpected end of JSON data'),
+        (b'{"records": [1, 2]} {}', 'Extra data at position 20 of JSON data'),
+    ]:
+        with open(json_path, 'wb') as output_stream:
+            output_stream.write(text)
+        if message is None:
+            with JsonFileIndex(json_path) as index:
+                assert [index.read(int, position) for position in range(len(index))] == [1, 2][:len(index)]
+        else:
+            with raises(ValueError) as excinfo:
+                JsonFileIndex(json_path)
+            assert str(excinfo.value).startswith(message)
+
+def test_profiler(capsys):
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('d', date),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('x', List[NamedTupleA]),
+    ])
+    value = NamedTupleB(x=[NamedTupleA(a=i, d=date(2017, 1, 2)) for i in range(3)])
+    with Profiler() as profiler:
+        data = serialize_json_gz(value, NamedTupleB)
+        assert read_json_gz(NamedTupleB, BytesIO(data)) == value
+        assert to_jsondata(value, NamedTupleB) == to_jsondata(value)
+    assert profiler.call_stats[('decode', NamedTupleB, None)][0] == 1
+    assert profiler.call_stats[('decode', NamedTupleA, 'd')][0] == 3
+    assert profiler.call_stats[('encode', NamedTupleA, 'a')][0] == 6 # Typed and untyped conversion
+    assert profiler.call_stats[('write', NamedTupleA, None)][0] == 3
+    assert profiler.io_stats['write'][1] == len(data)
+    assert profiler.io_stats['read'][1] >= len(data) # Python 2 reads beyond the end and seeks back
+    assert profiler.io_stats['gzip'][1] == profiler.io_stats['gunzip'][1] == len(serialize_json(value))
+    assert set_profiler(None) is None
+    read_json_gz(NamedTupleB, BytesIO(data))
+    assert profiler.call_stats[('decode', NamedTupleB, None)][0] == 1
+    profiler.report(limit=2)
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1 + 2 + 1 + 2 + 1 + 4
+    assert lines[-4].split() == ['gunzip', '1', lines[-4].split()[2], str(len(serialize_json(value)))]
+
+def test_from_jsondata_intern():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('status', InternedStr),
+        ('name', str),
+        ('tags', Dict[InternedStr, int]),
+    ])
+    def new_string(text):
+        return ''.join(list(text)) # Equal, but not identical
+    jsondata = {'records': [{'status': new_string('active'), 'name': new_string('xy'), 'tags': {new_string('k'): i}} for i in range(3)]}
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('records', List[NamedTupleA]),
+    ])
+    value = from_jsondata(NamedTupleB, jsondata)
+    assert value.records[0] == NamedTupleA(status='active', name='xy', tags={'k': 0})
+    assert value.records[0].status is value.records[2].status
+    assert list(value.records[0].tags)[0] is list(value.records[2].tags)[0]
+    assert value.records[0].name is not value.records[2].name
+    value = from_jsondata(NamedTupleB, jsondata, intern=True)
+    assert value.records[0].name is value.records[2].name
+    intern_table = InternTable(maxsize=2)
+    assert from_jsondata(List[str], ['a', 'b', 'c', new_string('c')], intern=intern_table) == ['a', 'b', 'c', 'c']
+    assert len(intern_table) == 1 # Cleared when full
+    assert read_json(NamedTupleB, BytesIO(serialize_json(value, NamedTupleB)), intern=intern_table) == value
+    assert serialize_json(value, NamedTupleB) == serialize_json(value)
+    with raises(ValueError) as excinfo:
+        from_jsondata(NamedTupleB, jsondata, intern='yes')
+    assert str(excinfo.value).startswith('Invalid intern argument, expected bool or InternTable: ')
+    intern_table_ref = ref(intern_table)
+    del intern_table
+    collect()
+    assert intern_table_ref() is None # Not kept alive by the decoder cache
+
+def test_from_jsondata_columnar():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('i', int),
+        ('f', float),
+        ('b', bool),
+        ('s', str),
+        ('d', datetime),
+        ('c', date),
+        ('t', timedelta),
+        ('n', datetime),
+        ('l', int),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('records', List[NamedTupleA]),
+    ])
+    jsondata = [
+        {'i': i, 'f': i * 0.5, 'b': i % 2 == 0, 's': 'x{}'.format(i), 'd': '2016-07-01T18:00:{:02}.123456Z'.format(i), 'c': '1969-12-{:02}'.format(i + 1), 't': i + 0.25, 'n': None, 'l': 10 ** 20 * i}
+        for i in range(3)
+    ]
+    value = from_jsondata_columnar(NamedTupleA, jsondata)
+    assert isinstance(value, ColumnarList)
+    assert len(value) == 3
+    assert value == from_jsondata(List[NamedTupleA], jsondata)
+    assert value[-1] == from_jsondata(NamedTupleA, jsondata[-1])
+    assert value[1:] == from_jsondata(List[NamedTupleA], jsondata[1:])
+    assert [isinstance(column, array) for column in value.columns.values()] == [True, True, True, False, True, True, True, False, False]
+    assert list(value.columns['d']) == [1467396000123456, 1467396001123456, 1467396002123456]
+    for compact in [False, True]:
+        assert serialize_json(NamedTupleB(records=value), NamedTupleB, compact) == serialize_json(NamedTupleB(records=list(value)), NamedTupleB, compact)
+        assert serialize_json(NamedTupleB(records=value), None, compact) == serialize_json(NamedTupleB(records=list(value)), None, compact)
+    with raises(ValueError) as excinfo:
+        from_jsondata_columnar(NamedTupleA, [None])
+    assert str(excinfo.value) == 'Unable to generate instance of {!r} from JSON data structure: None'.format(NamedTupleA)
+    with raises(ValueError) as excinfo:
+        from_jsondata_columnar(int, [])
+    assert str(excinfo.value) == 'Unable to store non-NamedTuple type in columnar list: {!r}'.format(int)
+
+def test_decode_cache():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('l', List[int]),
+    ])
+    data = [serialize_json(NamedTupleA(a=i, l=[i])) for i in range(3)]
+    cache = DecodeCache(maxbytes=2 * len(data[0]))
+    value = deserialize_json(NamedTupleA, data[0], cache=cache)
+    assert value == NamedTupleA(a=0, l=[0])
+    assert deserialize_json(NamedTupleA, data[0], cache=cache) is value
+    assert read_json(NamedTupleA, BytesIO(data[0]), cache=cache) is value
+    assert read_json(NamedTupleA, BytesIO(data[0]), lazy=True, cache=cache) is not value
+    assert (cache.hits, cache.misses, cache.evictions, len(cache), cache.size) == (2, 2, 0, 2, 2 * len(data[0]))
+    assert deserialize_json(NamedTupleA, data[1], cache=cache) == NamedTupleA(a=1, l=[1])
+    assert (cache.hits, cache.misses, cache.evictions, len(cache)) == (2, 3, 1, 2)
+    assert deserialize_json(NamedTupleA, data[0], cache=cache) is not value # Evicted as least recently used
+    with raises(ValueError):
+        deserialize_json(NamedTupleA, data[2][:-2], cache=cache)
+    value = deserialize_json(NamedTupleA, data[0], cache=cache)
+    interned_value = read_json(NamedTupleA, BytesIO(data[0]), intern=True, cache=cache)
+    assert interned_value is not value
+    assert read_json(NamedTupleA, BytesIO(data[0]), intern=True, cache=cache) is interned_value
+    cache = DecodeCache(copy_mutable=True)
+    value = deserialize_json(NamedTupleA, data[0], cache=cache)
+    value.l.append(1)
+    assert deserialize_json(NamedTupleA, data[0], cache=cache) == NamedTupleA(a=0, l=[0])
+    cache.clear()
+    assert (len(cache), cache.size) == (0, 0)
+
+def test_validate_jsondata():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+        ('d', date),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('b', List[str]),
+    ])
+    NamedTupleC = NamedTuple('NamedTupleC', [
+        ('x', List[NamedTupleA]),
+        ('u', Union[NamedTupleA, NamedTupleB]),
+        ('m', Dict[str, datetime]),
+        ('t', timedelta),
+    ])
+    jsondata = {
+        'x': [{'a': 1, 'd': '2016-02-29'}, {'a': None, 'd': None}],
+        'u': {'type': 'NamedTupleB', 'b': ['x', None]},
+        'm': {'k': '2016-07-01T18:00:28Z', 'l': '2016-07-01T18:00:28.123456Z'},
+        't': 1.5,
+    }
+    assert validate_jsondata(NamedTupleC, jsondata) == []
+    assert validate_json(NamedTupleC, BytesIO(serialize_json(from_jsondata(NamedTupleC, jsondata)))) == []
+    invalid_jsondata = {
+        'x': [{'a': 1, 'd': '2017-02-29'}, {'a': 'b', 'c': None}, {'a': 1}, None, 5],
+        'u': {'type': 'NamedTupleX'},
+        'm': {'k/~': 3},
+        't': 1,
+    }
+    errors = validate_jsondata(NamedTupleC, invalid_jsondata)
+    assert [error.path for error in errors] == ['/x/0/d', '/x/1/a', '/x/1/d', '/x/2', '/x/4', '/u', '/m/k~1~0', '/t']
+    assert errors[1] == ValidationError(path='/x/1/a', message='Unable to generate instance of {!r} from JSON data structure: {!r}'.format(int, 'b'))
+    assert errors[2].message == 'Missing field'
+    assert errors[5].message.startswith('Unable to find type ')
+    for key in invalid_jsondata:
+        with raises(ValueError):
+            from_jsondata(NamedTupleC, dict(jsondata, **{key: invalid_jsondata[key]}))
+    assert validate_jsondata(Dict[int, str], {}) == [ValidationError(path='', message='Invalid key type for JSON object: int')]
+    assert validate_json(NamedTupleC, BytesIO(b'[]')) == [ValidationError(path='', message='For security reasons, refusing to handle JSON data whose toplevel is not a JSON object')]
+    assert len(validate_json(NamedTupleC, BytesIO(b'{'))) == 1
+
+def test_read_json_gz_members():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+    ])
+    values = [NamedTupleA(a=i) for i in range(3)]
+    members = [serialize_json_gz(value) for value in values]
+    data = members[0] + b'\0\0' + members[1] + members[2]
+    assert list(iter_read_json_gz_members(NamedTupleA, BytesIO(data))) == values
+    assert list(iter_read_json_gz_members(NamedTupleA, OneByteStream(data))) == values
+    assert list(iter_read_json_gz_members(NamedTupleA, BytesIO(b''))) == []
+    jsonbytes = serialize_json(values[1])
+    output_stream = BytesIO()
+    for piece in [jsonbytes[:5], jsonbytes[5:]]:
+        with GzipFile(fileobj=output_stream, mode='wb') as uncompressed_stream:
+            uncompressed_stream.write(piece)
+    assert read_json_gz(NamedTupleA, BytesIO(output_stream.getvalue())) == values[1]
+    assert read_json_gz(NamedTupleA, OneByteStream(output_stream.getvalue() + b'\0')) == values[1]
+    with raises(IOError):
+        read_json_gz(NamedTupleA, BytesIO(b'{}'))
+
+def test_gzip_options_threads():
+    value = {'a': ['x{}'.format(i) for i in range(1000)]}
+    jsonbytes = serialize_json(value)
+    outputs = [serialize_json_gz(value, gzip_options=GzipOptions(threads=threads, block_size=1000)) for threads in [2, 3, 8]]
+    assert outputs[0] == outputs[1] == outputs[2]
+    assert GzipFile(fileobj=BytesIO(outputs[0]), mode='rb').read() == jsonbytes
+    assert read_json_gz(Dict[str, List[str]], BytesIO(outputs[0])) == value
+    assert len(list(iter_read_json_gz_members(Dict[str, List[str]], BytesIO(serialize_json_gz({}, gzip_options=GzipOptions(threads=2)))))) == 1
+    with raises(ValueError):
+        list(iter_read_json_gz_members(Dict[str, List[str]], BytesIO(outputs[0]))) # Members are blocks, not documents
+    assert repr(GzipOptions(threads=2)) == 'GzipOptions(compresslevel=9, strategy=None, buffer_size=65536, threads=2, block_size=1048576)'
+    with raises(ValueError) as excinfo:
+        GzipOptions(threads=0)
+    assert str(excinfo.value) == 'Invalid number of threads: 0'
+    with raises(ValueError) as excinfo:
+        GzipOptions(threads=2, block_size=0)
+    assert str(excinfo.value) == 'Invalid block size: 0'
+
+def test_optional():
+    NamedTupleA = NamedTuple('NamedTupleA', [
+        ('a', int),
+    ])
+    NamedTupleB = NamedTuple('NamedTupleB', [
+        ('a', Optional[int]),
+        ('b', Optional[List[Optional[date]]]),
+        ('c', Optional[NamedTupleA]),
+    ])
+    values = [
+        NamedTupleB(a=1, b=[date(2017, 1, 2), None], c=NamedTupleA(a=2)),
+        NamedTupleB(a=None, b=None, c=None),
+    ]
+    for value in values:
+        jsondata = to_jsondata(value, NamedTupleB)
+        assert from_jsondata(NamedTupleB, jsondata) == value
+        assert read_json(NamedTupleB, BytesIO(serialize_json(value))) == value
+        assert validate_jsondata(NamedTupleB, jsondata) == []
+    assert to_jsondata(values[0], NamedTupleB) == {'a': 1, 'b': ['2017-01-02', None], 'c': {'a': 2, 'type': 'NamedTupleA'}}
+    assert from_jsondata(Optional[int], None) is None
+    with raises(ValueError):
+        from_jsondata(Optional[int], 'x')
+
+@mark.skipif(version_info < (3, 10), reason='Builtin generics and X | Y require Python 3.10')
+def test_modern_type_annotations():
+    namespace = {}
+    exec(dedent('''
+        from datetime import date
+        from typing import NamedTuple
+
+        class NamedTupleA(NamedTuple):
+            a: int
+            b: list[date] | None
+
+        class NamedTupleB(NamedTuple):
+            x: dict[str, NamedTupleA]
+            y: NamedTupleA | None
+    '''), namespace)
+    (NamedTupleA, NamedTupleB) = (namespace['NamedTupleA'], namespace['NamedTupleB'])
+    class NamedTupleASubClass(NamedTupleA):
+        pass
+    value = NamedTupleB(x={'k': NamedTupleA(a=1, b=[date(2017, 1, 2)])}, y=NamedTupleA(a=2, b=None))
+    jsondata = to_jsondata(value, NamedTupleB)
+    assert jsondata == {'x': {'k': {'a': 1, 'b': ['2017-01-02']}}, 'y': {'a': 2, 'b': None, 'type': 'NamedTupleA'}}
+    assert to_jsondata(value) == jsondata
+    assert from_jsondata(NamedTupleB, jsondata) == value
+    assert read_json(NamedTupleB, BytesIO(serialize_json(value, NamedTupleB))) == value
+    assert validate_jsondata(NamedTupleB, jsondata) == []
+    assert to_jsondata(NamedTupleASubClass(a=3, b=None)) == {'a': 3, 'b': None}
+    assert from_jsondata(list[int], [1, 2]) == [1, 2]
+
+@mark.skipif(version_info < (3, 9), reason='Forward references are resolved on Python 3.9+')
+def test_recursive_namedtuple():
+    value = RecursiveNamedTuple(name='a', children=[RecursiveNamedTuple(name='b', children=[]), RecursiveNamedTuple(name='c', children=[RecursiveNamedTuple(name='d', children=[])])])
+    jsondata = to_jsondata(value, RecursiveNamedTuple)
+    assert jsondata == {'name': 'a', 'children': [{'name': 'b', 'children': []}, {'name': 'c', 'children': [{'name': 'd', 'children': []}]}]}
+    assert to_jsondata(value) == jsondata
+    assert from_jsondata(RecursiveNamedTuple, jsondata) == value
+    assert serialize_json(value, RecursiveNamedTuple) == serialize_json(value) == serialize_json(jsondata)
+    assert read_json(RecursiveNamedTuple, BytesIO(serialize_json(value, RecursiveNamedTuple, compact=True))) == value
+    assert from_jsondata_lazy(RecursiveNamedTuple, jsondata).children[1].children[0].name == 'd'
+    assert validate_jsondata(RecursiveNamedTuple, jsondata) == []
+    jsondata['children'][1]['children'][0]['name'] = 1
+    assert [error.path for error in validate_jsondata(RecursiveNamedTuple, jsondata)] == ['/children/1/children/0/name']
+    with raises(ValueError):
+        from_jsondata_lazy(RecursiveNamedTuple, jsondata)
+
+def test_lazy_module_imports():
+    code = 'import sys, jsontyping; print(sorted(set(sys.modules) & {"gzip", "concurrent.futures"}))'
+    assert check_output([executable, '-c', code], cwd=dirname(dirname(abspath(__file__)))).strip() == b'[]'
@@ -0,0 +1,153 @@
+__copyright__ = '''\
+Copyright (C) m-click.aero GmbH
+
+Permission to use, copy, modify, and/or distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+'''
+
+import asyncio
+from datetime import datetime, timedelta
+from jsontyping import GzipOptions, read_json_gz, serialize_json, serialize_json_gz
+from jsontyping_async import async_iter_read_json, async_read_json, async_read_json_gz, async_write_json, async_write_json_gz
+from io import BytesIO
+from pytest import raises
+from socket import socketpair
+from typing import List, NamedTuple
+
+NamedTupleA = NamedTuple('NamedTupleA', [
+    ('a', int),
+    ('d', datetime),
+])
+
+NamedTupleB = NamedTuple('NamedTupleB', [
+    ('x', str),
+    ('records', List[NamedTupleA]),
+])
+
+def run(coroutine_function):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine_function())
+    finally:
+        loop.close()
+
+async def open_stream_pair():
+    '''Return (reader, writer, unused_writer), unused_writer must be kept, because deleting it closes the reader on Python 3.11+.'''
+    (socket_a, socket_b) = socketpair()
+    (_, writer) = await asyncio.open_connection(sock=socket_a)
+    (reader, unused_writer) = await asyncio.open_connection(sock=socket_b)
+    return (reader, writer, unused_writer)
+
+async def transfer(write, read):
+    (reader, writer, unused_writer) = await open_stream_pair()
+    async def write_and_close():
+        await write(writer)
+        writer.close()
+    (_, result) = await asyncio.gather(write_and_close(), read(reader))
+    unused_writer.close()
+    return result
+
+def test_async_read_write_json():
+    value = NamedTupleB(x='§', records=[NamedTupleA(a=i, d=datetime(2017, 1, 2) + timedelta(seconds=i)) for i in range(10000)])
+    async def roundtrip():
+        result = await transfer(lambda writer: async_write_json(writer, value, NamedTupleB), lambda reader: async_read_json(NamedTupleB, reader))
+        assert result == value
+        result = await transfer(lambda writer: async_write_json_gz(writer, value, compact=True), lambda reader: async_read_json_gz(NamedTupleB, reader))
+        assert result == value
+        async def read_items(reader):
+            return [item async for item in async_iter_read_json(NamedTupleA, reader)]
+        result = await transfer(lambda writer: async_write_json(writer, value), read_items)
+        assert result == value.records
+        with raises(ValueError) as excinfo:
+            await transfer(lambda writer: async_write_json(writer, value), lambda reader: read_items_from(reader, 'y'))
+        assert str(excinfo.value) == "Unable to find array field 'y' in JSON object"
+    async def read_items_from(reader, path):
+        return [item async for item in async_iter_read_json(NamedTupleA, reader, path)]
+    run(roundtrip)
+
+class ChunkedReader(object):
+    def __init__(self, data, chunk_size):
+        self.data = data
+        self.chunk_size = chunk_size
+    async def read(self, size=-1):
+        (chunk, self.data) = (self.data[:self.chunk_size], self.data[self.chunk_size:])
+        return chunk
+
+NamedTupleC = NamedTuple('NamedTupleC', [
+    ('b', float),
+    ('records', List[float]),
+    ('c', List[NamedTupleA]),
+])
+
+def test_async_read_json_split_chunks():
+    value = NamedTupleC(b=-1.5e-3, records=[12.5, 2e3, -4.25, 1e+16, 0.0], c=[NamedTupleA(a=-12, d=datetime(2017, 1, 2))])
+    data = serialize_json(value, compact=True)
+    data_gz = serialize_json_gz(value)
+    async def read_all(chunk_size):
+        assert await async_read_json(NamedTupleC, ChunkedReader(data, chunk_size)) == value
+        assert await async_read_json_gz(NamedTupleC, ChunkedReader(data_gz, chunk_size)) == value
+        assert [item async for item in async_iter_read_json(float, ChunkedReader(data, chunk_size))] == value.records
+    for chunk_size in range(1, len(data) + 1):
+        run(lambda: read_all(chunk_size))
+    with raises(ValueError) as excinfo:
+        run(lambda: async_read_json(NamedTupleC, ChunkedReader(b'[1]', 1)))
+    assert str(excinfo.value) == 'For security reasons, refusing to handle JSON data whose toplevel is not a JSON object'
+
+class RecordingWriter(object):
+    def __init__(self, fail_after=None):
+        self.chunks = []
+        self.fail_after = fail_after
+    def write(self, data):
+        if len(self.chunks) == self.fail_after:
+            raise ConnectionResetError()
+        self.chunks.append(data)
+    async def drain(self):
+        await asyncio.sleep(0)
+
+def test_async_read_json_responsive():
+    value = NamedTupleB(x='', records=[NamedTupleA(a=i, d=datetime(2017, 1, 2) + timedelta(seconds=i)) for i in range(60000)])
+    data = serialize_json(value, compact=True)
+    async def read_while_ticking():
+        ticks = [0]
+        done = False
+        async def tick():
+            while not done:
+                ticks[0] += 1
+                await asyncio.sleep(0)
+        ticker = asyncio.ensure_future(tick())
+        result = await async_read_json(NamedTupleB, ChunkedReader(data, 65536))
+        done = True
+        await ticker
+        assert result == value
+        return ticks[0]
+    assert run(read_while_ticking) >= len(data) // 65536 # The loop runs while each chunk is parsed
+
+def test_async_write_json_chunks():
+    value = NamedTupleB(x='§', records=[NamedTupleA(a=i, d=datetime(2017, 1, 2) + timedelta(seconds=i)) for i in range(20000)])
+    async def write_all():
+        for compact in [False, True]:
+            for value_type in [None, NamedTupleB]:
+                writer = RecordingWriter()
+                await async_write_json(writer, value, value_type, compact=compact)
+                assert len(writer.chunks) > 10 # Handed over while serializing
+                assert b''.join(writer.chunks) == serialize_json(value, value_type, compact=compact)
+        writer = RecordingWriter()
+        await async_write_json_gz(writer, value, gzip_options=GzipOptions(buffer_size=1024))
+        assert len(writer.chunks) > 1
+        assert read_json_gz(NamedTupleB, BytesIO(b''.join(writer.chunks))) == value
+        with raises(ValueError) as excinfo:
+            await async_write_json(RecordingWriter(), [value])
+        assert str(excinfo.value) == 'For security reasons, refusing to handle JSON data whose toplevel is not a JSON object'
+        for write_json in [async_write_json, async_write_json_gz]:
+            with raises(ConnectionResetError):
+                await write_json(RecordingWriter(fail_after=2), value)
+    run(write_all)